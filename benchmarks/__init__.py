@@ -0,0 +1,10 @@
+"""Benchmarks for oncequinox.
+
+JAX is pinned to the CPU backend, so that results do not depend on which
+accelerators the machine has.
+
+"""
+
+import os
+
+os.environ.setdefault("JAX_PLATFORMS", "cpu")
@@ -0,0 +1,75 @@
+"""Benchmarks for the ``leafless`` policy: arrays as constants or as arguments.
+
+A leafless singleton's arrays are embedded in compiled functions as constants;
+otherwise they are passed as arguments on every call.
+
+"""
+
+import types
+
+import equinox as eqx
+import jax
+import jax.numpy as jnp
+
+from oncequinox import SingletonModuleMeta
+
+POLICIES = ("argument", "constant", "auto")
+SIZES = {"1 KiB": 256, "4 MiB": 1_048_576}  # float32 entries
+
+
+def _table_class(policy: str, size: int) -> type:
+    leafless = {"argument": False, "constant": True, "auto": "auto"}[policy]
+
+    def body(ns: dict[str, object]) -> None:
+        ns["__annotations__"] = {"values": jax.Array}
+        ns["values"] = eqx.field(
+            default_factory=lambda: jnp.linspace(0, 1, size, dtype=jnp.float32),
+        )
+
+    return types.new_class(
+        f"Table_{policy}_{size}",
+        (eqx.Module,),
+        {"metaclass": SingletonModuleMeta, "leafless": leafless, "warmup": False},
+        body,
+    )
+
+
+TABLES = {(p, s): _table_class(p, n) for p in POLICIES for s, n in SIZES.items()}
+
+
+def _lookup(table: eqx.Module, idx: jax.Array) -> jax.Array:
+    return jnp.take(table.values, idx).sum()
+
+
+_jitted_lookup = jax.jit(_lookup)
+
+
+class _EmbedBenchmark:
+    params = (POLICIES, tuple(SIZES))
+    param_names = ("policy", "size")
+
+    def setup(self, policy: str, size: str) -> None:
+        self.table = TABLES[policy, size]()
+        self.idx = jnp.arange(0, SIZES[size], SIZES[size] // 128)
+
+
+class TimeCompile(_EmbedBenchmark):
+    """Time to trace, lower and compile a table lookup."""
+
+    def time_compile(self, policy: str, size: str) -> None:  # noqa: ARG002
+        # A new function each time, so nothing is reused from JAX's caches.
+        def lookup(table: eqx.Module, idx: jax.Array) -> jax.Array:
+            return _lookup(table, idx)
+
+        jax.jit(lookup).lower(self.table, self.idx).compile()
+
+
+class TimeCall(_EmbedBenchmark):
+    """Steady-state latency of a compiled table lookup."""
+
+    def setup(self, policy: str, size: str) -> None:
+        super().setup(policy, size)
+        _jitted_lookup(self.table, self.idx).block_until_ready()
+
+    def time_call(self, policy: str, size: str) -> None:  # noqa: ARG002
+        _jitted_lookup(self.table, self.idx).block_until_ready()
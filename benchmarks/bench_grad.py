@@ -0,0 +1,141 @@
+"""Benchmarks for ``jax.grad`` through a model holding a 100 MB singleton table.
+
+The table is either differentiable, the default, or marked with
+``differentiable=False``. It is then an argument whose gradient is zeros, as it is
+too large for ``leafless="auto"`` to embed, or, with ``leafless=True``, a constant
+of the compiled function with no cotangent at all.
+
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import equinox as eqx
+import jax
+import jax.numpy as jnp
+
+from oncequinox import SingletonModuleMeta
+
+TABLE_SIZE = 25_000_000  # float32, 100 MB
+N_LOOKUPS = 1024
+_ROOT = Path(__file__).parents[1]  # where the `benchmarks` package can be imported
+
+
+def _table() -> jax.Array:
+    return jnp.linspace(0.0, 1.0, TABLE_SIZE, dtype=jnp.float32)
+
+
+class Table(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A differentiable table."""
+
+    values: jax.Array = eqx.field(default_factory=_table)
+
+
+class ConstantTable(
+    eqx.Module,
+    metaclass=SingletonModuleMeta,
+    warmup=False,
+    differentiable=False,
+):
+    """The same table, kept out of autodiff."""
+
+    values: jax.Array = eqx.field(default_factory=_table)
+
+
+class EmbeddedTable(
+    eqx.Module,
+    metaclass=SingletonModuleMeta,
+    warmup=False,
+    differentiable=False,
+    leafless=True,
+):
+    """The same table, kept out of autodiff and embedded as a constant."""
+
+    values: jax.Array = eqx.field(default_factory=_table)
+
+
+class Model(eqx.Module):
+    """Small weights next to a large lookup table."""
+
+    weights: jax.Array
+    table: eqx.Module
+
+
+def _loss(model: Model, idx: jax.Array) -> jax.Array:
+    rows = jnp.take(model.table.values, idx).reshape(-1, 8)
+    return (rows @ model.weights).sum()
+
+
+_GRADS = {"eager": jax.grad(_loss), "jit": jax.jit(jax.grad(_loss))}
+_TABLES = {
+    "differentiable": Table,
+    "constant": ConstantTable,
+    "embedded": EmbeddedTable,
+}
+
+
+def _setup(table: str) -> tuple[Model, jax.Array]:
+    model = Model(jnp.ones(8), _TABLES[table]())
+    idx = jnp.arange(N_LOOKUPS) * (TABLE_SIZE // N_LOOKUPS)
+    return jax.block_until_ready((model, idx))
+
+
+# Run in a fresh interpreter, so that the peak memory is that of one first call.
+_FIRST_CALL = """
+import json, resource, sys, time
+sys.path.insert(0, sys.argv[3])
+import jax
+from benchmarks.bench_grad import _GRADS, _setup
+model, idx = _setup(sys.argv[1])
+grad = _GRADS[sys.argv[2]]
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+jax.block_until_ready(grad(model, idx))
+elapsed = time.perf_counter() - start
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "peak_mb": (after - before) / 1024}))
+"""
+
+
+def _first_call(table: str, mode: str) -> dict[str, float]:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _FIRST_CALL, table, mode, str(_ROOT)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)  # type: ignore[no-any-return]
+
+
+class _GradBenchmark:
+    params = (tuple(_TABLES), tuple(_GRADS))
+    param_names = ("table", "grad")
+    timeout = 300
+
+
+class TimeGrad(_GradBenchmark):
+    """Steady-state time of a gradient, once compiled."""
+
+    def setup(self, table: str, mode: str) -> None:
+        self.grad = _GRADS[mode]
+        self.model, self.idx = _setup(table)
+        jax.block_until_ready(self.grad(self.model, self.idx))
+
+    def time_grad(self, table: str, mode: str) -> None:  # noqa: ARG002
+        jax.block_until_ready(self.grad(self.model, self.idx))
+
+
+class TrackFirstGrad(_GradBenchmark):
+    """Time and peak memory growth of the first gradient, compilation included."""
+
+    def track_first_grad_time(self, table: str, mode: str) -> float:
+        return _first_call(table, mode)["seconds"]
+
+    track_first_grad_time.unit = "s"  # type: ignore[attr-defined]
+
+    def track_first_grad_peak_memory(self, table: str, mode: str) -> float:
+        return _first_call(table, mode)["peak_mb"]
+
+    track_first_grad_peak_memory.unit = "MB"  # type: ignore[attr-defined]
@@ -0,0 +1,34 @@
+"""Import-time benchmarks, measured with ``python -X importtime``."""
+
+import subprocess
+import sys
+
+
+def _import_time_us(module: str) -> float:
+    """Cumulative time to import ``module`` in a fresh interpreter, in µs."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    # Lines look like "import time: self [us] | cumulative | imported package".
+    for line in result.stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if fields[-1] == module:
+            return float(fields[1])
+    msg = f"{module} not found in the -X importtime output"
+    raise RuntimeError(msg)
+
+
+class TrackImportTime:
+    """Cost of importing the package, and of the first use of a public name."""
+
+    unit = "us"
+
+    def track_import(self) -> float:
+        return _import_time_us("oncequinox")
+
+    def track_import_singleton(self) -> float:
+        # What resolving `oncequinox.SingletonModuleMeta` costs: equinox and JAX.
+        return _import_time_us("oncequinox._singleton")
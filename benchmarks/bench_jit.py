@@ -0,0 +1,59 @@
+"""Benchmarks for singletons passed to `jax.jit`."""
+
+import functools
+
+import equinox as eqx
+import jax
+import jax.numpy as jnp
+
+from oncequinox import SingletonModuleMeta
+
+N_FIELDS = 32
+
+
+def _fields(n: int) -> dict[str, object]:
+    return {"__annotations__": {f"f{i}": int for i in range(n)}} | {
+        f"f{i}": i for i in range(n)
+    }
+
+
+# The same configuration, as a plain module and as a singleton.
+PlainConfig = type("PlainConfig", (eqx.Module,), _fields(N_FIELDS))
+SingletonConfig = SingletonModuleMeta(
+    "SingletonConfig",
+    (eqx.Module,),
+    _fields(N_FIELDS),
+)
+
+
+@functools.partial(jax.jit, static_argnums=1)
+def _scale(x: jax.Array, cfg: eqx.Module) -> jax.Array:
+    return x * cfg.f1
+
+
+class TimeStaticArgDispatch:
+    """Dispatch overhead of a cached `jax.jit` call with a static config.
+
+    The static argument is hashed and compared on every call to look up the
+    compiled function: field by field for a plain module, by identity for a
+    singleton.
+    """
+
+    def setup(self) -> None:
+        self.x = jnp.ones(())
+        self.plain = PlainConfig()
+        self.singleton = SingletonConfig()
+        _scale(self.x, self.plain).block_until_ready()
+        _scale(self.x, self.singleton).block_until_ready()
+
+    def time_plain_module(self) -> None:
+        _scale(self.x, self.plain)
+
+    def time_singleton(self) -> None:
+        _scale(self.x, self.singleton)
+
+    def time_hash_plain_module(self) -> None:
+        hash(self.plain)
+
+    def time_hash_singleton(self) -> None:
+        hash(self.singleton)
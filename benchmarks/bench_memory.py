@@ -0,0 +1,44 @@
+"""Memory cost of singleton classes, measured with `tracemalloc`."""
+
+import tracemalloc
+
+import equinox as eqx
+
+from oncequinox import SingletonModuleMeta
+
+N_CLASSES = 200
+
+
+def _bytes_per_class(metaclass: type) -> float:
+    """Memory held by each of ``N_CLASSES`` new classes and their instances."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = []
+        for i in range(N_CLASSES):
+            cls = metaclass(
+                f"Config{i}",
+                (eqx.Module,),
+                {"__annotations__": {"value": int}, "value": i},
+            )
+            kept.append((cls, cls()))
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / N_CLASSES
+
+
+class TrackMemoryPerClass:
+    """Bytes held by a registered singleton class and its instance.
+
+    A plain module class and its instance are the baseline; the difference is
+    the registry's per-class state.
+    """
+
+    unit = "bytes"
+
+    def track_plain_module(self) -> float:
+        return _bytes_per_class(type(eqx.Module))
+
+    def track_singleton(self) -> float:
+        return _bytes_per_class(SingletonModuleMeta)
@@ -0,0 +1,114 @@
+"""Benchmarks for flattening singletons, as done on every `jax.jit` dispatch."""
+
+import equinox as eqx
+import jax
+import jax.numpy as jnp
+
+import oncequinox as oqx
+from oncequinox import SingletonModuleMeta
+
+N_FIELDS = 100
+
+
+def _fields(n: int) -> dict[str, object]:
+    return {"__annotations__": {f"a{i}": jax.Array for i in range(n)}}
+
+
+def _init(self: eqx.Module) -> None:
+    for i in range(N_FIELDS):
+        setattr(self, f"a{i}", jnp.full((4,), float(i)))
+
+
+# ~100 array fields, as a plain module and as a singleton.
+PlainTables = type(
+    "PlainTables",
+    (eqx.Module,),
+    _fields(N_FIELDS) | {"__init__": _init},
+)
+SingletonTables = SingletonModuleMeta(
+    "SingletonTables",
+    (eqx.Module,),
+    _fields(N_FIELDS) | {"__init__": _init},
+)
+
+
+@jax.jit
+def _first(tables: eqx.Module) -> jax.Array:
+    return tables.a0
+
+
+class TimeFlatten:
+    """Cost of flattening a module with many array leaves."""
+
+    def setup(self) -> None:
+        self.plain = PlainTables()
+        self.singleton = SingletonTables()
+        jax.tree_util.tree_flatten(self.singleton)  # fill the cache
+
+    def time_flatten_plain_module(self) -> None:
+        jax.tree_util.tree_flatten(self.plain)
+
+    def time_flatten_singleton(self) -> None:
+        jax.tree_util.tree_flatten(self.singleton)
+
+
+class TimeUnflatten:
+    """Cost of rebuilding a module with many array leaves from its leaves."""
+
+    def setup(self) -> None:
+        self.plain = jax.tree_util.tree_flatten(PlainTables())
+        self.singleton = jax.tree_util.tree_flatten(SingletonTables())
+
+    def time_unflatten_plain_module(self) -> None:
+        leaves, treedef = self.plain
+        jax.tree_util.tree_unflatten(treedef, leaves)
+
+    def time_unflatten_singleton(self) -> None:
+        leaves, treedef = self.singleton
+        jax.tree_util.tree_unflatten(treedef, leaves)
+
+
+class TimeJitDispatch:
+    """Dispatch overhead of a cached `jax.jit` call taking ~100 array leaves."""
+
+    def setup(self) -> None:
+        self.plain = PlainTables()
+        self.singleton = SingletonTables()
+        _first(self.plain).block_until_ready()
+        _first(self.singleton).block_until_ready()
+
+    def time_dispatch_plain_module(self) -> None:
+        _first(self.plain)
+
+    def time_dispatch_singleton(self) -> None:
+        _first(self.singleton)
+
+
+@eqx.filter_jit
+def _eqx_first(tables: eqx.Module, x: jax.Array) -> jax.Array:
+    return tables.a0 + x
+
+
+@oqx.filter_jit
+def _oqx_first(tables: eqx.Module, x: jax.Array) -> jax.Array:
+    return tables.a0 + x
+
+
+class TimeFilterJitDispatch:
+    """Dispatch overhead of ``filter_jit`` with a ~100-array singleton argument.
+
+    Equinox's flattens the singleton and passes its arrays as inputs; the
+    oncequinox wrapper makes the singleton static, hashed by identity.
+    """
+
+    def setup(self) -> None:
+        self.singleton = SingletonTables()
+        self.x = jnp.ones(4)
+        _eqx_first(self.singleton, self.x).block_until_ready()
+        _oqx_first(self.singleton, self.x).block_until_ready()
+
+    def time_eqx_filter_jit(self) -> None:
+        _eqx_first(self.singleton, self.x)
+
+    def time_oqx_filter_jit(self) -> None:
+        _oqx_first(self.singleton, self.x)
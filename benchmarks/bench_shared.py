@@ -0,0 +1,107 @@
+"""Benchmarks for handing a large singleton to the workers of a process pool.
+
+A singleton published through shared memory is compared with an equivalent plain
+module, which is pickled by value to each worker.
+"""
+
+import multiprocessing
+import multiprocessing.synchronize
+import pickle
+import statistics
+import time
+from pathlib import Path
+
+import equinox as eqx
+import numpy as np
+
+from oncequinox import SingletonModuleMeta
+
+N_WORKERS = 8
+TABLE_SIZE = 8_000_000  # float64, 64 MB
+
+
+def _table() -> np.ndarray:
+    return np.linspace(0.0, 1.0, TABLE_SIZE)
+
+
+class PlainTable(eqx.Module):
+    """The same table, as a plain module."""
+
+    table: np.ndarray = eqx.field(default_factory=_table)
+
+
+class SharedTable(
+    eqx.Module,
+    metaclass=SingletonModuleMeta,
+    warmup=False,
+    shared_memory=True,
+):
+    """The table, published through shared memory."""
+
+    table: np.ndarray = eqx.field(default_factory=_table)
+
+
+def _pss_mb() -> float:
+    """Proportional set size of this process, so shared pages are split fairly."""
+    for line in Path("/proc/self/smaps_rollup").read_text().splitlines():
+        if line.startswith("Pss:"):
+            return int(line.split()[1]) / 1024
+    msg = "no Pss in /proc/self/smaps_rollup"
+    raise RuntimeError(msg)
+
+
+_barrier = None
+
+
+def _init(barrier: multiprocessing.synchronize.Barrier) -> None:
+    global _barrier  # noqa: PLW0603
+    _barrier = barrier
+
+
+def _receive(payload: bytes) -> tuple[float, float]:
+    """Unpickle the table in a worker; return the latency in ms and the PSS in MB."""
+    start = time.perf_counter()
+    module = pickle.loads(payload)  # noqa: S301
+    latency = time.perf_counter() - start
+    float(module.table.sum())  # touch every page
+    _barrier.wait()  # every worker holds the table: PSS is now split N ways
+    return 1e3 * latency, _pss_mb()
+
+
+class _PoolBenchmark:
+    params = ("shared_memory", "pickle")
+    param_names = ("publication",)
+    timeout = 300
+
+    def setup(self, publication: str) -> None:
+        module = SharedTable() if publication == "shared_memory" else PlainTable()
+        self.payload = pickle.dumps(module)
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(N_WORKERS)
+        self.pool = ctx.Pool(N_WORKERS, _init, (barrier,))
+
+    def teardown(self, publication: str) -> None:  # noqa: ARG002
+        self.pool.terminate()
+        self.pool.join()
+
+    def _run(self) -> list[tuple[float, float]]:
+        # One task per worker: each blocks on the barrier until all have one.
+        return self.pool.map(_receive, [self.payload] * N_WORKERS, chunksize=1)
+
+
+class TrackWorkerMemory(_PoolBenchmark):
+    """Total proportional memory of 8 workers holding a 64 MB table."""
+
+    unit = "MB"
+
+    def track_total_pss(self, publication: str) -> float:  # noqa: ARG002
+        return sum(pss for _, pss in self._run())
+
+
+class TrackAttachLatency(_PoolBenchmark):
+    """Median time for a worker to unpickle the 64 MB table."""
+
+    unit = "ms"
+
+    def track_attach_latency(self, publication: str) -> float:  # noqa: ARG002
+        return statistics.median(latency for latency, _ in self._run())
@@ -0,0 +1,67 @@
+"""Benchmarks for ``SingletonModuleMeta.__call__``.
+
+These are written in the `asv <https://asv.readthedocs.io>`_ style: any method
+named ``time_*`` is timed, and ``setup`` runs before the timings are taken.
+
+"""
+
+import equinox as eqx
+
+from oncequinox import SingletonModuleMeta, _singleton
+
+
+class Config(eqx.Module, metaclass=SingletonModuleMeta):
+    """A minimal singleton."""
+
+    value: int = 42
+
+
+class PlainConfig(eqx.Module):
+    """The same module, without the metaclass."""
+
+    value: int = 42
+
+
+# Baseline: the cheapest possible way to reach a shared object.
+CONSTANT = Config()
+
+
+class Fresh(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A singleton whose instance is forgotten before every call below."""
+
+    value: int = 42
+
+
+def _forget() -> None:
+    _singleton._unpublish(Fresh, Fresh.__singleton_state__)  # noqa: SLF001
+
+
+class TimeHit:
+    """Latency of a cache hit, next to a plain module-level constant."""
+
+    def setup(self) -> None:
+        Config()  # make sure every call below is a hit
+
+    def time_singleton_hit(self) -> None:
+        Config()
+
+    def time_module_constant(self) -> None:
+        CONSTANT  # noqa: B018
+
+
+class TimeFirstConstruction:
+    """Cost of building the instance, next to constructing a plain module.
+
+    Each singleton call first forgets the instance, so it is always a miss;
+    ``time_forget`` times that reset alone, to be subtracted.
+    """
+
+    def time_plain_module(self) -> None:
+        PlainConfig()
+
+    def time_singleton_miss(self) -> None:
+        _forget()
+        Fresh()
+
+    def time_forget(self) -> None:
+        _forget()
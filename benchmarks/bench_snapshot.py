@@ -0,0 +1,55 @@
+"""Benchmarks for starting a spawn-mode process pool, with and without `restore`."""
+
+import math
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+import equinox as eqx
+import numpy as np
+
+from oncequinox import SingletonModuleMeta, restore, snapshot
+
+N_WORKERS = 4
+
+
+class ExpensiveTable(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A singleton whose ``__init__`` tabulates a function in pure Python."""
+
+    table: np.ndarray
+
+    def __init__(self) -> None:  # noqa: D107
+        grid = np.linspace(-5.0, 5.0, 2_000_000).tolist()
+        self.table = np.asarray([math.erf(x) for x in grid])
+
+
+def _build() -> None:
+    ExpensiveTable()
+
+
+def _ready(_: int) -> bool:
+    return ExpensiveTable().table.size > 0
+
+
+class TimePoolStart:
+    """Time for every worker of a fresh pool to hold the singleton."""
+
+    params = (False, True)
+    param_names = ("restore",)
+    timeout = 300
+
+    def setup(self, use_restore: bool) -> None:  # noqa: ARG002, FBT001
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "singletons.eqx"
+        snapshot(self.path, [ExpensiveTable])
+
+    def teardown(self, use_restore: bool) -> None:  # noqa: ARG002, FBT001
+        self.tmp.cleanup()
+
+    def time_pool_start(self, use_restore: bool) -> None:  # noqa: FBT001
+        initializer, initargs = (restore, (self.path,)) if use_restore else (_build, ())
+        ctx = multiprocessing.get_context("spawn")
+        # `multiprocessing.Pool` starts every worker up front, unlike
+        # `ProcessPoolExecutor`, so all of them run the initializer.
+        with ctx.Pool(N_WORKERS, initializer, initargs) as pool:
+            pool.map(_ready, range(N_WORKERS))
@@ -0,0 +1,59 @@
+"""Multi-thread throughput of ``SingletonModuleMeta.__call__`` hits.
+
+On free-threaded builds (PEP 703, e.g. 3.13t) throughput should grow with the
+number of threads; with the GIL it stays roughly flat.
+
+"""
+
+import threading
+import time
+
+import equinox as eqx
+
+from oncequinox import SingletonModuleMeta
+
+CALLS_PER_THREAD = 100_000
+
+
+def _make_class() -> type:
+    class Config(eqx.Module, metaclass=SingletonModuleMeta):
+        value: int = 42
+
+    Config()
+    return Config
+
+
+def _hammer(cls: type, barrier: threading.Barrier) -> None:
+    barrier.wait()
+    for _ in range(CALLS_PER_THREAD):
+        cls()
+
+
+class TrackThroughput:
+    """Hits per second from N threads, on one shared class or one class each."""
+
+    params = ([1, 2, 4, 8], ["shared", "distinct"])
+    param_names = ("n_threads", "classes")
+    unit = "calls/s"
+
+    def setup(self, n_threads: int, classes: str) -> None:
+        shared = _make_class()
+        self.classes = [
+            shared if classes == "shared" else _make_class() for _ in range(n_threads)
+        ]
+
+    def track_hits_per_second(self, n_threads: int, classes: str) -> float:
+        del classes
+        barrier = threading.Barrier(n_threads + 1)
+        threads = [
+            threading.Thread(target=_hammer, args=(cls, barrier))
+            for cls in self.classes
+        ]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        return n_threads * CALLS_PER_THREAD / elapsed
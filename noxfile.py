@@ -74,6 +74,30 @@ def tests(session: nox.Session, /) -> None:
     session.run("pytest", *session.posargs)
 
 
+@nox.session(venv_backend="uv")
+def benchmarks(session: nox.Session, /) -> None:
+    """Run the asv benchmarks against the current checkout.
+
+    Results are written as JSON to ``.asv/results`` so they can be compared
+    across commits with ``asv compare``.
+    """
+    session.run_install(
+        "uv",
+        "sync",
+        "--group=bench",
+        f"--python={session.virtualenv.location}",
+        env={"UV_PROJECT_ENVIRONMENT": session.virtualenv.location},
+    )
+    session.run("asv", "machine", "--yes")
+    session.run(
+        "asv",
+        "run",
+        "--python=same",
+        "--set-commit-hash=HEAD",
+        *session.posargs,
+    )
+
+
 # =============================================================================
 
 
@@ -2,8 +2,79 @@
 
 oncequinox: a module for creating singleton Equinox modules.
 
+The public names are resolved lazily, so ``import oncequinox`` does not import
+equinox or JAX until one of them is first used.
+
 """
 
-__all__ = ("SingletonModuleMeta",)
+__all__ = (
+    "BuildSchedule",
+    "LazySingleton",
+    "MultitonModuleMeta",
+    "Retrace",
+    "SingletonDeadlockError",
+    "SingletonModuleMeta",
+    "SingletonStats",
+    "dependencies",
+    "filter_grad",
+    "filter_jit",
+    "filter_vmap",
+    "is_singleton",
+    "registry_stats",
+    "restore",
+    "schedule",
+    "snapshot",
+    "warmup",
+    "watch_retraces",
+)
+
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._lazy import LazySingleton
+    from ._multiton import MultitonModuleMeta
+    from ._retrace import Retrace, watch_retraces
+    from ._schedule import BuildSchedule, dependencies, schedule
+    from ._singleton import SingletonDeadlockError, SingletonModuleMeta
+    from ._snapshot import restore, snapshot
+    from ._stats import SingletonStats, registry_stats
+    from ._transforms import filter_grad, filter_jit, filter_vmap, is_singleton
+    from ._warmup import warmup
+
+# Public name -> the private submodule defining it.
+_LAZY_ATTRS: dict[str, str] = {
+    "BuildSchedule": "._schedule",
+    "LazySingleton": "._lazy",
+    "MultitonModuleMeta": "._multiton",
+    "Retrace": "._retrace",
+    "SingletonDeadlockError": "._singleton",
+    "SingletonModuleMeta": "._singleton",
+    "SingletonStats": "._stats",
+    "dependencies": "._schedule",
+    "filter_grad": "._transforms",
+    "filter_jit": "._transforms",
+    "filter_vmap": "._transforms",
+    "is_singleton": "._transforms",
+    "registry_stats": "._stats",
+    "restore": "._snapshot",
+    "schedule": "._schedule",
+    "snapshot": "._snapshot",
+    "warmup": "._warmup",
+    "watch_retraces": "._retrace",
+}
+
+
+def __getattr__(name: str, /) -> object:
+    try:
+        module_name = _LAZY_ATTRS[name]
+    except KeyError:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg) from None
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value  # later lookups skip this function
+    return value
+
 
-from ._singleton import SingletonModuleMeta
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,130 @@
+"""Defines a proxy that defers building a singleton until it is first used."""
+
+from __future__ import annotations
+
+__all__ = ("LazySingleton",)
+
+
+import inspect
+import types
+from typing import TYPE_CHECKING, Any
+
+import jax.tree_util as jtu
+
+if TYPE_CHECKING:
+    from ._singleton import SingletonModuleMeta
+
+_WRAPPED_KEY = jtu.GetAttrKey("__wrapped__")
+
+
+class LazySingleton:
+    """Stand-in for a singleton instance that is built on first use.
+
+    Returned by `SingletonModuleMeta.lazy`. The instance is built, through the
+    class's usual ``__call__``, the first time an attribute of the proxy is read,
+    the proxy is called, or the proxy is flattened as a pytree. The instance
+    itself is available as ``proxy.__wrapped__``.
+
+    Once the instance is built its field values, and its methods as they are
+    looked up, are copied onto the proxy, so later reads are plain instance
+    attribute lookups that never reach the forwarding ``__getattr__``. Properties
+    are always forwarded. For ``weak=True`` classes nothing is copied, so the proxy
+    never keeps the instance alive, and every access goes through the class.
+
+    The proxy reports the class as its ``__class__``, so ``isinstance`` checks
+    pass, but it is a distinct object: use ``proxy.__wrapped__`` where identity
+    matters. As a pytree it is a node with the instance as its only child, so
+    ``jax.jit`` and friends see the instance's leaves.
+
+    """
+
+    __slots__ = ("__dict__", "__lazy_args__", "__lazy_cls__", "__lazy_kwargs__")
+
+    __lazy_args__: tuple[Any, ...]
+    __lazy_cls__: SingletonModuleMeta
+    __lazy_kwargs__: dict[str, Any]
+
+    def __init__(
+        self,
+        cls: SingletonModuleMeta,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        /,
+    ) -> None:
+        self.__lazy_cls__ = cls
+        self.__lazy_args__ = args
+        self.__lazy_kwargs__ = kwargs
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> type:
+        return self.__lazy_cls__
+
+    def __getattr__(self, name: str, /) -> Any:  # noqa: ANN401
+        # Only reached on a miss: before the build, or for uncached attributes.
+        if name.startswith("__lazy_"):  # unset slot, e.g. mid-unpickle
+            raise AttributeError(name)
+        cls = self.__lazy_cls__
+        instance = cls(*self.__lazy_args__, **self.__lazy_kwargs__)
+        value = instance if name == "__wrapped__" else getattr(instance, name)
+        if cls.__singleton_state__.weak:
+            return value
+
+        cache = self.__dict__
+        if not cache:
+            cache.update(vars(instance))
+            cache["__wrapped__"] = instance
+        if isinstance(inspect.getattr_static(cls, name, None), types.FunctionType):
+            cache[name] = value  # a bound method of the instance
+        return value
+
+    def __setattr__(self, name: str, value: object, /) -> None:
+        if name.startswith("__lazy_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.__wrapped__, name, value)
+
+    def __call__(self, /, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        return self.__wrapped__(*args, **kwargs)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return LazySingleton, (
+            self.__lazy_cls__,
+            self.__lazy_args__,
+            self.__lazy_kwargs__,
+        )
+
+    def __copy__(self) -> LazySingleton:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, object], /) -> LazySingleton:
+        return self
+
+    def __repr__(self) -> str:
+        try:
+            return repr(self.__dict__["__wrapped__"])
+        except KeyError:
+            return f"{self.__lazy_cls__.__qualname__}.lazy()"
+
+
+def _flatten(proxy: LazySingleton, /) -> tuple[tuple[object], None]:
+    return (proxy.__wrapped__,), None
+
+
+def _flatten_with_keys(
+    proxy: LazySingleton,
+    /,
+) -> tuple[tuple[tuple[jtu.GetAttrKey, object]], None]:
+    return ((_WRAPPED_KEY, proxy.__wrapped__),), None
+
+
+def _unflatten(_: None, children: tuple[object], /) -> object:
+    # Unflattening gives back the instance: there is nothing left to defer.
+    return children[0]
+
+
+jtu.register_pytree_with_keys(
+    LazySingleton,
+    _flatten_with_keys,
+    _unflatten,  # type: ignore[arg-type]
+    _flatten,
+)
@@ -0,0 +1,146 @@
+"""Defines a metaclass for multiton Equinox modules."""
+
+from __future__ import annotations
+
+__all__ = ("MultitonModuleMeta",)
+
+
+import inspect
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from ._singleton import ModuleMeta
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+    from types import EllipsisType
+
+# Default bound on the number of live instances per class, as `functools.lru_cache`.
+_DEFAULT_MAXSIZE = 128
+
+
+class _MultitonState:
+    """Per-class instance cache."""
+
+    __slots__ = ("cache", "lock", "maxsize", "signature")
+
+    def __init__(self, signature: inspect.Signature, maxsize: int | None) -> None:
+        self.signature = signature
+        self.maxsize = maxsize
+        self.cache: OrderedDict[Hashable, object] = OrderedDict()
+        # Re-entrant so an ``__init__`` may build another key of the same class.
+        self.lock = threading.RLock()
+
+
+def _make_key(
+    sig: inspect.Signature,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    /,
+) -> Hashable:
+    """Bind the arguments to a canonical, hashable key.
+
+    Positional and keyword spellings of the same call, and calls relying on
+    defaults, all map to the same key. As with ``functools.lru_cache(typed=True)``,
+    each argument is keyed along with its type, so that equal arguments of
+    different types (``1``, ``1.0`` and ``True``) map to different keys.
+
+    """
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+    key = []
+    for name, value in bound.arguments.items():
+        kind = sig.parameters[name].kind
+        typed: tuple[Any, ...]
+        if kind is inspect.Parameter.VAR_POSITIONAL:
+            typed = tuple((type(v), v) for v in value)
+        elif kind is inspect.Parameter.VAR_KEYWORD:
+            typed = tuple(sorted((k, type(v), v) for k, v in value.items()))
+        else:
+            typed = (type(value), value)
+        key.append((name, typed))
+    return tuple(key)
+
+
+class MultitonModuleMeta(ModuleMeta):  # type: ignore[misc]
+    """A metaclass for multiton Equinox modules.
+
+    Where `SingletonModuleMeta` keeps one instance per class, this metaclass keeps
+    one instance per distinct set of constructor arguments. Arguments are bound to
+    the class signature, so positional, keyword and defaulted spellings of the
+    same call share an instance. The arguments must be hashable, and equal
+    arguments of different types, such as ``1`` and ``1.0``, do not share one.
+
+    The number of live instances per class is bounded by the ``maxsize`` class
+    keyword (default 128); the least recently used instance is evicted first.
+    Pass ``maxsize=None`` for an unbounded cache. Subclasses inherit the bound of
+    their parent unless they set their own.
+
+    Examples:
+        >>> import equinox as eqx
+        >>> import oncequinox as oqx
+        >>> class Kernel(eqx.Module, metaclass=oqx.MultitonModuleMeta, maxsize=2):
+        ...     order: int
+        ...     scale: float = 1.0
+        >>> Kernel(1) is Kernel(order=1, scale=1.0)
+        True
+        >>> Kernel(1) is Kernel(2)
+        False
+
+        Once the bound is exceeded the least recently used instance is dropped:
+
+        >>> k1 = Kernel(1)
+        >>> _ = Kernel(2), Kernel(3)
+        >>> Kernel(1) is k1
+        False
+
+    """
+
+    __multiton_state__: _MultitonState
+
+    def __new__(  # noqa: PYI034
+        mcs: type[MultitonModuleMeta],
+        name: str,
+        bases: tuple[type, ...],
+        dict_: dict[str, Any],
+        /,
+        *,
+        maxsize: int | EllipsisType | None = ...,
+        **kwargs: object,
+    ) -> MultitonModuleMeta:
+        cls = super().__new__(mcs, name, bases, dict_, **kwargs)
+        if maxsize is ...:
+            parent = getattr(cls, "__multiton_state__", None)
+            maxsize = _DEFAULT_MAXSIZE if parent is None else parent.maxsize
+        elif maxsize is not None and maxsize < 1:
+            msg = f"maxsize must be a positive integer or None, not {maxsize!r}"
+            raise ValueError(msg)
+        # Cache the signature once; binding is then the only per-call cost.
+        cls.__multiton_state__ = _MultitonState(inspect.signature(cls), maxsize)
+        return cls  # type: ignore[no-any-return]
+
+    def __call__(cls, /, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, N805
+        state = cls.__multiton_state__
+        key = _make_key(state.signature, args, kwargs)
+        try:
+            hash(key)
+        except TypeError as e:
+            msg = f"arguments to {cls.__qualname__!r} must be hashable"
+            raise TypeError(msg) from e
+
+        with state.lock:
+            cache = state.cache
+            try:
+                self = cache[key]
+            except KeyError:
+                pass
+            else:
+                cache.move_to_end(key)
+                return self
+
+            self = super().__call__(*args, **kwargs)
+            cache[key] = self
+            if state.maxsize is not None and len(cache) > state.maxsize:
+                cache.popitem(last=False)
+            return self
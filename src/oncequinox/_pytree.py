@@ -0,0 +1,85 @@
+"""Hooks into equinox's pytree registration of module classes."""
+
+from __future__ import annotations
+
+__all__: tuple[str, ...] = ()
+
+
+import os
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import jax.tree_util as jtu
+
+FlattenFunc = Callable[[Any], tuple[Any, Any]]
+UnflattenFunc = Callable[[Any, Any], Any]
+PytreeFuncs = tuple[FlattenFunc, FlattenFunc, UnflattenFunc]
+# (cls, (flatten, flatten_with_keys, unflatten)) -> the functions to register.
+WrapFunc = Callable[[type, PytreeFuncs], PytreeFuncs]
+
+_local = threading.local()
+_patch_lock = threading.RLock()
+_original = jtu.register_pytree_with_keys
+
+
+def _register_pytree_with_keys(
+    nodetype: type,
+    flatten_with_keys: FlattenFunc,
+    unflatten_func: UnflattenFunc,
+    flatten_func: FlattenFunc | None = None,
+) -> None:
+    """Stand-in for `jax.tree_util.register_pytree_with_keys`.
+
+    Only the thread that installed a wrapper sees it; registrations from any
+    other thread pass straight through.
+
+    """
+    wrap: WrapFunc | None = getattr(_local, "wrap", None)
+    if wrap is not None and flatten_func is not None:
+        _local.wrap = None  # one registration per class
+        flatten_func, flatten_with_keys, unflatten_func = wrap(
+            nodetype,
+            (flatten_func, flatten_with_keys, unflatten_func),
+        )
+    _original(
+        nodetype,
+        flatten_with_keys=flatten_with_keys,
+        unflatten_func=unflatten_func,
+        flatten_func=flatten_func,
+    )
+
+
+@contextmanager
+def wrapping_registration(wrap: WrapFunc, /) -> Iterator[None]:
+    """Let ``wrap`` replace the pytree functions equinox registers for a class.
+
+    `equinox.Module` classes are registered with JAX inside
+    ``ModuleMeta.__new__``, and JAX refuses to register a type twice. So for the
+    duration of the class creation, `jax.tree_util.register_pytree_with_keys` is
+    routed through ``wrap``, which receives equinox's generated ``(flatten,
+    flatten_with_keys, unflatten)`` and returns the functions to register
+    instead.
+
+    """
+    with _patch_lock:
+        _local.wrap = wrap
+        jtu.register_pytree_with_keys = _register_pytree_with_keys
+        try:
+            yield
+        finally:
+            jtu.register_pytree_with_keys = _original
+            _local.wrap = None
+
+
+def _after_fork_in_child() -> None:
+    # A class may have been mid-creation on another thread, which is gone.
+    global _patch_lock  # noqa: PLW0603
+    _patch_lock = threading.RLock()
+    _local.wrap = None
+    jtu.register_pytree_with_keys = _original
+
+
+if hasattr(os, "register_at_fork"):  # not on Windows
+    os.register_at_fork(after_in_child=_after_fork_in_child)
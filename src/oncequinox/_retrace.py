@@ -0,0 +1,237 @@
+"""Diagnosing `jax.jit` retraces caused by singletons."""
+
+from __future__ import annotations
+
+__all__ = ("Retrace", "watch_retraces")
+
+
+import collections
+import sys
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+import equinox as eqx
+import jax
+import jax.monitoring
+import jax.tree_util as jtu
+
+from . import _singleton
+from ._singleton import _MISSING, SingletonModuleMeta, _lookup
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import FrameType
+
+_TRACE_EVENT = "/jax/core/compile/jaxpr_trace_duration"
+# Frames in these packages are skipped when looking for the caller.
+_INTERNAL = (*jax.__path__, *eqx.__path__, str(Path(__file__).parent))
+# Flattened singletons not yet matched to a trace, per thread, newest last. Most
+# flattens (e.g. by `jax.tree_util.tree_map`) never are, so only the latest are kept.
+_MAX_PENDING = 256
+
+_lock = threading.Lock()
+_local = threading.local()
+_logs: list[list[Retrace]] = []  # one per active `watch_retraces`
+# Identity and treedef of the argument of each class in its latest trace.
+_previous: weakref.WeakKeyDictionary[
+    SingletonModuleMeta,
+    tuple[weakref.ref[object], jtu.PyTreeDef],
+]
+_previous = weakref.WeakKeyDictionary()
+_listening = False
+
+
+class Retrace(NamedTuple):
+    """A trace by `jax.jit` with a singleton in its arguments, see `watch_retraces`."""
+
+    function: str
+    """Name of the traced function, as reported by JAX."""
+
+    cls: SingletonModuleMeta
+    """Class of the singleton in the arguments."""
+
+    identity_changed: bool
+    """Whether the argument is another instance than in the previous trace.
+
+    For the first trace with ``cls``, it is compared with the registered instance.
+    """
+
+    treedef_changed: bool
+    """Whether the argument's treedef differs from that in the previous trace."""
+
+    location: str
+    """Where the traced function was called, as ``file:line in function``."""
+
+    def __str__(self) -> str:
+        if self.treedef_changed:
+            what = "a new instance, with a different treedef"
+        elif self.identity_changed:
+            what = "a new instance, with the same treedef"
+        else:
+            what = "the same instance"
+        return (
+            f"{self.function} traced at {self.location} with "
+            f"{self.cls.__qualname__}: {what}"
+        )
+
+
+class _Seen(NamedTuple):
+    cls: SingletonModuleMeta
+    ref: weakref.ref[object]  # not the instance: a weak class's may be freed
+    treedef: jtu.PyTreeDef
+    site: tuple[int, int]  # the caller's frame and instruction
+    location: str
+
+
+def _caller() -> FrameType:
+    """Return the innermost frame outside of JAX, equinox and this package."""
+    frame = sys._getframe(1)  # noqa: SLF001
+    while frame.f_back is not None and frame.f_code.co_filename.startswith(_INTERNAL):
+        frame = frame.f_back
+    return frame
+
+
+def _node(x: object, /) -> jtu.PyTreeDef:
+    """Treedef of ``x`` itself, with its children as leaves."""
+    return jtu.tree_structure(x, is_leaf=lambda y: y is not x)
+
+
+def _pending() -> collections.deque[_Seen]:
+    try:
+        pending: collections.deque[_Seen] = _local.pending
+    except AttributeError:
+        pending = _local.pending = collections.deque(maxlen=_MAX_PENDING)
+    return pending
+
+
+def _unobserved_node(x: object, /) -> jtu.PyTreeDef:
+    """`_node`, without `_observe` seeing ``x`` being flattened."""
+    _local.busy = True
+    try:
+        return _node(x)
+    finally:
+        _local.busy = False
+
+
+def _observe(cls: SingletonModuleMeta, obj: object, /) -> None:
+    """Remember a singleton being flattened, e.g. as an argument of `jax.jit`."""
+    if getattr(_local, "busy", False):
+        return
+    frame = _caller()
+    code = frame.f_code
+    location = f"{code.co_filename}:{frame.f_lineno} in {code.co_name}"
+    site = (id(frame), frame.f_lasti)
+    seen = _Seen(cls, weakref.ref(obj), _unobserved_node(obj), site, location)
+    _pending().append(seen)
+
+
+def _record(function: str, seen: _Seen, /) -> Retrace:
+    """Compare ``seen`` with the previous trace of its class. Hold `_lock`."""
+    previous = _previous.get(seen.cls)
+    if previous is None:
+        registered = _lookup(seen.cls, seen.cls.__singleton_state__)
+        if registered is not _MISSING:
+            previous = weakref.ref(registered), _unobserved_node(registered)
+    _previous[seen.cls] = seen.ref, seen.treedef
+    if previous is None:  # the argument was built outside the registry
+        return Retrace(function, seen.cls, True, False, seen.location)  # noqa: FBT003
+    ref, treedef = previous
+    return Retrace(
+        function,
+        seen.cls,
+        # A freed instance cannot be the argument, which is alive.
+        ref() is None or ref() is not seen.ref(),
+        seen.treedef != treedef,
+        seen.location,
+    )
+
+
+def _on_duration(event: str, duration_secs: float, **kwargs: str | int) -> None:  # noqa: ARG001
+    """Match a finished trace with the singletons its call flattened."""
+    if event != _TRACE_EVENT or not _logs:
+        return
+    pending = _pending()
+    if not pending:
+        return
+    # The arguments of a call are flattened in the caller's frame, at the call
+    # instruction, as is the trace. Other flattens happened elsewhere. A call may
+    # flatten its arguments several times, and earlier calls from the same site
+    # (e.g. in a loop) flattened theirs too: the latest one of each class is the
+    # argument that was traced.
+    frame = _caller()
+    site = (id(frame), frame.f_lasti)
+    latest = {seen.cls: seen for seen in pending if seen.site == site}
+    if not latest:
+        return
+    rest = [seen for seen in pending if seen.site != site]
+    pending.clear()
+    pending.extend(rest)
+
+    function = str(kwargs.get("fun_name", "<unknown>"))
+    with _lock:
+        records = [_record(function, seen) for seen in latest.values()]
+        for log in _logs:
+            log.extend(records)
+
+
+@contextmanager
+def watch_retraces() -> Iterator[list[Retrace]]:
+    """Record every `jax.jit` trace with a singleton in its arguments.
+
+    Within the context, each time a function is traced (on its first call, and
+    whenever it recompiles), a `Retrace` is appended to the yielded list for
+    every singleton among the arguments. It reports whether the argument is the
+    same instance as in the previous trace with its class (for the first one, the
+    registered instance), whether its treedef differs, and where the traced
+    function was called. A singleton that is rebuilt (e.g. a freed ``weak=True``
+    singleton) or copied (e.g. by ``eqx.tree_at``) is a new instance, and if its
+    static fields differ it makes `jax.jit` recompile.
+
+    Singletons are seen as they are flattened, as `jax.jit` does with its
+    arguments and ``eqx.filter_jit`` with every argument, or as
+    `oncequinox.filter_jit` makes them static. Static arguments of `jax.jit`
+    (``static_argnums``) are hashed, not flattened, and so are not seen. Watching
+    slows down flattening singletons, so it is meant for diagnosis rather than
+    production.
+
+    Examples:
+        >>> import equinox as eqx
+        >>> import jax.numpy as jnp
+        >>> import oncequinox as oqx
+        >>> class Scale(eqx.Module, metaclass=oqx.SingletonModuleMeta, weak=True):
+        ...     factor: float = eqx.field(static=True, default=2.0)
+        >>> @eqx.filter_jit
+        ... def apply(scale, x):
+        ...     return scale.factor * x
+        >>> scale = Scale()
+        >>> with oqx.watch_retraces() as retraces:
+        ...     _ = apply(scale, jnp.ones(3))
+        ...     _ = apply(scale, jnp.ones(3))  # cached: no trace
+        ...     _ = apply(scale, jnp.ones(4))  # new shape
+        ...     del scale  # frees the weakly-held singleton
+        ...     _ = apply(Scale(3.0), jnp.ones(4))  # rebuilt, with another factor
+        >>> [(r.identity_changed, r.treedef_changed) for r in retraces]
+        [(False, False), (False, False), (True, True)]
+        >>> print(retraces[-1])
+        apply traced at ... with Scale: a new instance, with a different treedef
+
+    """
+    global _listening  # noqa: PLW0603
+    log: list[Retrace] = []
+    with _lock:
+        if not _listening:  # listeners cannot be removed on older JAX versions
+            jax.monitoring.register_event_duration_secs_listener(_on_duration)
+            _listening = True
+        _logs.append(log)
+        _singleton._observer = _observe  # noqa: SLF001
+    try:
+        yield log
+    finally:
+        with _lock:
+            _logs.remove(log)
+            if not _logs:
+                _singleton._observer = None  # noqa: SLF001
+                _previous.clear()
@@ -0,0 +1,206 @@
+"""Dependency-aware, parallel construction of singletons."""
+
+from __future__ import annotations
+
+__all__ = ("BuildSchedule", "dependencies", "schedule")
+
+
+import dataclasses
+import graphlib
+import time
+import typing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from ._singleton import SingletonModuleMeta
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from concurrent.futures import Executor
+
+
+class BuildSchedule(NamedTuple):
+    """The outcome of `schedule`."""
+
+    times: dict[SingletonModuleMeta, float]
+    """Construction time, in seconds, of each class that was built."""
+
+    critical_path: tuple[SingletonModuleMeta, ...]
+    """The chain of dependencies with the longest total construction time."""
+
+    critical_time: float
+    """Total construction time along the critical path, in seconds."""
+
+
+def dependencies(cls: SingletonModuleMeta, /) -> tuple[SingletonModuleMeta, ...]:
+    """Return the singleton classes that ``cls`` needs to be built first.
+
+    These are the classes declared with the ``depends_on`` class keyword, plus
+    any singleton class used as the ``default_factory`` of a field, or as the
+    annotation of a field or ``__init__`` parameter of ``cls``. Annotations that
+    cannot be resolved are ignored.
+
+    Examples:
+        >>> import equinox as eqx
+        >>> import oncequinox as oqx
+        >>> class Units(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+        ...     pass
+        >>> class Grid(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+        ...     units: Units = eqx.field(default_factory=Units)
+        >>> class Solver(eqx.Module, metaclass=oqx.SingletonModuleMeta, depends_on=[Grid]):
+        ...     pass
+        >>> oqx.dependencies(Grid), oqx.dependencies(Solver)
+        ((<class '...Units'>,), (<class '...Grid'>,))
+
+    """  # noqa: E501
+    found = dict.fromkeys(cls.__singleton_state__.depends_on)
+    for field in dataclasses.fields(cls):
+        if isinstance(field.default_factory, SingletonModuleMeta):
+            found[field.default_factory] = None
+    for obj in (cls, cls.__init__):  # type: ignore[misc]
+        try:
+            hints = typing.get_type_hints(obj)
+        except (NameError, TypeError):  # unresolvable or local forward references
+            continue
+        for hint in hints.values():
+            if isinstance(hint, SingletonModuleMeta):
+                found[hint] = None
+    found.pop(cls, None)
+    return tuple(found)
+
+
+def _graph(
+    classes: Iterable[SingletonModuleMeta],
+    /,
+    include: Callable[[SingletonModuleMeta], bool] | None = None,
+) -> dict[SingletonModuleMeta, tuple[SingletonModuleMeta, ...]]:
+    """Dependency graph of ``classes`` and, transitively, their dependencies.
+
+    Dependencies rejected by ``include`` are left out of the graph, along with
+    their own dependencies: they are built by the classes that use them.
+
+    """
+    graph: dict[SingletonModuleMeta, tuple[SingletonModuleMeta, ...]] = {}
+    todo = list(classes)
+    while todo:
+        cls = todo.pop()
+        if cls not in graph:
+            deps = dependencies(cls)
+            if include is not None:
+                deps = tuple(filter(include, deps))
+            graph[cls] = deps
+            todo.extend(deps)
+    return graph
+
+
+def _build_in_order(
+    graph: dict[SingletonModuleMeta, tuple[SingletonModuleMeta, ...]],
+    pool: Executor,
+    build: Callable[[SingletonModuleMeta], Any],
+    done: Callable[[SingletonModuleMeta, Any], None],
+    /,
+) -> None:
+    """Submit ``build`` to ``pool`` for each class, once its dependencies are built.
+
+    ``done`` is called, on this thread, with each class and the result of its
+    build. After a build fails no more builds are submitted, and its exception
+    is raised once the builds in flight have finished.
+
+    """
+    sorter = graphlib.TopologicalSorter(graph)
+    sorter.prepare()  # raises CycleError up front
+
+    error: BaseException | None = None
+    running: dict[Future[Any], SingletonModuleMeta] = {}
+    while error is None and sorter.is_active():
+        for cls in sorter.get_ready():
+            running[pool.submit(build, cls)] = cls
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            cls = running.pop(future)
+            if (exc := future.exception()) is not None:
+                error = error or exc
+                continue
+            done(cls, future.result())
+            sorter.done(cls)
+    wait(running)  # let in-flight builds finish before reporting
+    for future, cls in running.items():
+        if future.exception() is None:
+            done(cls, future.result())
+    if error is not None:
+        raise error
+
+
+def _critical_path(
+    graph: dict[SingletonModuleMeta, tuple[SingletonModuleMeta, ...]],
+    times: dict[SingletonModuleMeta, float],
+    /,
+) -> tuple[tuple[SingletonModuleMeta, ...], float]:
+    """Longest path through ``graph``, weighting each class by its build time."""
+    finish: dict[SingletonModuleMeta, float] = {}
+    via: dict[SingletonModuleMeta, SingletonModuleMeta | None] = {}
+    for cls in graphlib.TopologicalSorter(graph).static_order():
+        prev = max(graph[cls], key=finish.__getitem__, default=None)
+        via[cls] = prev
+        finish[cls] = times.get(cls, 0.0) + (0.0 if prev is None else finish[prev])
+
+    end = max(finish, key=finish.__getitem__, default=None)
+    path = []
+    while end is not None:
+        path.append(end)
+        end = via[end]
+    return tuple(reversed(path)), finish[path[0]] if path else 0.0
+
+
+def _timed_build(cls: SingletonModuleMeta, /) -> float:
+    start = time.perf_counter()
+    cls()
+    return time.perf_counter() - start
+
+
+def schedule(
+    classes: Iterable[SingletonModuleMeta],
+    /,
+    *,
+    max_workers: int | None = None,
+) -> BuildSchedule:
+    """Build singletons in dependency order, with maximum parallelism.
+
+    The dependency graph of ``classes`` (see `dependencies`) is checked for
+    cycles before anything is built. Each class is then built on a thread pool
+    as soon as all of its dependencies are built, so independent branches of
+    the graph are built in parallel. Classes that are already built take no
+    time.
+
+    Args:
+        classes: the classes to build, along with their dependencies.
+        max_workers: passed to the `concurrent.futures.ThreadPoolExecutor`.
+
+    Returns:
+        The build times, and the critical path: the chain of dependencies that
+        bounded the total build time.
+
+    Raises:
+        graphlib.CycleError: if the classes depend on each other in a cycle.
+        Exception: the first exception raised by a build. Classes depending on
+            the failed one are not built.
+
+    Examples:
+        >>> import equinox as eqx
+        >>> import oncequinox as oqx
+        >>> class Units(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+        ...     pass
+        >>> class Grid(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+        ...     units: Units = eqx.field(default_factory=Units)
+        >>> result = oqx.schedule([Grid])
+        >>> [c.__name__ for c in result.critical_path]
+        ['Units', 'Grid']
+
+    """
+    graph = _graph(classes)
+    times: dict[SingletonModuleMeta, float] = {}
+    with ThreadPoolExecutor(max_workers, "oncequinox-schedule") as pool:
+        _build_in_order(graph, pool, _timed_build, times.__setitem__)
+
+    path, total = _critical_path(graph, times)
+    return BuildSchedule(times, path, total)
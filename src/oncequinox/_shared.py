@@ -0,0 +1,155 @@
+"""Publishing singletons to other processes through shared memory."""
+
+from __future__ import annotations
+
+__all__: tuple[str, ...] = ()
+
+
+import atexit
+import contextlib
+import dataclasses
+import os
+import sys
+import threading
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, NamedTuple
+
+import jax.numpy as jnp
+import jax.tree_util as jtu
+import numpy as np
+
+from ._singleton import _MISSING, _install_fields, _lookup
+from ._snapshot import _ArraySpec, _combine, _instance, _Key, _key, _resolve, _split
+
+# Offsets of the arrays in a segment are multiples of this, as for `np.save`.
+_ALIGN = 64
+
+# Held while arrays are copied to a new segment, and reset in forked children.
+_lock = threading.Lock()
+# Handle of each published instance, so that it is copied to shared memory once.
+_handles: weakref.WeakKeyDictionary[object, _Handle] = weakref.WeakKeyDictionary()
+# Segments attached by this process. They stay open for the life of the process,
+# as the attached arrays are views of them.
+_attached: dict[str, SharedMemory] = {}
+
+
+@dataclasses.dataclass(frozen=True)
+class _Slot:
+    """Where a published array lives in its segment."""
+
+    spec: _ArraySpec
+    offset: int
+
+
+class _Handle(NamedTuple):
+    """What is pickled in place of a published singleton."""
+
+    key: _Key
+    name: str  # of the shared memory segment
+    static: Any
+    layout: Any  # the array fields, with `_Slot` leaves
+
+
+def _unlink(segment: SharedMemory, owner: int, /) -> None:
+    # Removes the name only: the memory itself is freed by the operating system
+    # once every process that attached to it has detached (or exited).
+    if os.getpid() == owner:  # not in a forked child
+        segment.close()
+        with contextlib.suppress(FileNotFoundError):  # unlinked by another process
+            segment.unlink()
+
+
+def _open(name: str, /) -> SharedMemory:
+    """Attach to the segment ``name``, which stays owned by its publisher."""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)
+    segment = SharedMemory(name)
+    if os.name == "posix":
+        # Attaching registers the segment with this process's resource tracker,
+        # which would unlink it when this process exits.
+        resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore[attr-defined]  # noqa: SLF001
+    return segment
+
+
+def share(self: object, /) -> _Handle:
+    """Copy the array fields of ``self`` to shared memory, once, and return a handle.
+
+    The segment is owned by this process, and its name is unlinked when this
+    process exits.
+
+    """
+    with _lock:
+        if (handle := _handles.get(self)) is not None:
+            return handle
+
+        dynamic, static = _split(self)
+        arrays, treedef = jtu.tree_flatten(dynamic)
+
+        slots = []
+        size = 0
+        for x in arrays:
+            size = -(-size // _ALIGN) * _ALIGN
+            slots.append(_Slot(_ArraySpec.of(x), size))
+            size += x.nbytes
+        segment = SharedMemory(create=True, size=max(size, 1))
+        atexit.register(_unlink, segment, os.getpid())
+        for x, slot in zip(arrays, slots):
+            view: np.ndarray = np.ndarray(
+                x.shape,
+                x.dtype,
+                buffer=segment.buf,
+                offset=slot.offset,
+            )
+            view[...] = np.asarray(x)
+            del view  # the segment can only be closed once no views remain
+
+        layout = jtu.tree_unflatten(treedef, slots)
+        handle = _Handle(_key(type(self)), segment.name, static, layout)  # type: ignore[arg-type]
+        _handles[self] = handle
+        return handle
+
+
+def attach(handle: _Handle, /) -> object:
+    """Install a published singleton in this process, unless it is already built.
+
+    NumPy array fields are read-only views of the shared memory segment, so no
+    data is copied. JAX array fields are copied into JAX's own buffers.
+
+    """
+    cls = _resolve(handle.key)
+    if cls is None:
+        msg = f"cannot import the singleton class {'.'.join(handle.key)}"
+        raise ValueError(msg)
+    if (self := _lookup(cls, cls.__singleton_state__)) is not _MISSING:
+        return self
+
+    with _lock:
+        segment = _attached.get(handle.name)
+        if segment is None:
+            segment = _attached[handle.name] = _open(handle.name)
+
+    def load(slot: _Slot, /) -> object:
+        spec = slot.spec
+        array: np.ndarray = np.ndarray(
+            spec.shape,
+            spec.dtype,
+            buffer=segment.buf,
+            offset=slot.offset,
+        )
+        array.flags.writeable = False
+        return array if spec.host else jnp.asarray(array)
+
+    dynamic = jtu.tree_map(load, handle.layout)
+    return _install_fields(cls, _combine(handle.static, dynamic, _instance))
+
+
+def _after_fork_in_child() -> None:
+    # Another thread may have been copying arrays, and is gone.
+    global _lock  # noqa: PLW0603
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):  # not on Windows
+    os.register_at_fork(after_in_child=_after_fork_in_child)
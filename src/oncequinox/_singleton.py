@@ -1,25 +1,750 @@
 """Defines a metaclass for singleton Equinox modules."""
 
-__all__ = ("SingletonModuleMeta",)
+from __future__ import annotations
 
+__all__ = ("SingletonDeadlockError", "SingletonModuleMeta")
 
+
+import asyncio
+import functools
+import os
+import threading
+import time
+import tracemalloc
 import weakref
-from typing import Any
+from typing import TYPE_CHECKING, Any, Final, Literal, Union
 
 import equinox as eqx
+import jax
+import jax.tree_util as jtu
+
+from ._lazy import LazySingleton
+from ._pytree import PytreeFuncs, wrapping_registration
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
 
 ModuleMeta: type[type[eqx.Module]] = type(eqx.Module)
 
-_singleton_insts: weakref.WeakKeyDictionary[type, object] = weakref.WeakKeyDictionary()
+# Every class created by `SingletonModuleMeta`, built or not, for registry-wide
+# operations (enumerating, warming up and snapshotting the singletons). Each
+# instance lives in its class, see `_lookup`.
+_classes: weakref.WeakSet[SingletonModuleMeta] = weakref.WeakSet()
+# `WeakSet` is not safe to mutate concurrently once the GIL is gone (PEP 703), so
+# every access to ``_classes`` goes through this lock. Only class creation and
+# registry-wide operations take it; neither hits nor misses do.
+_registry_lock = threading.Lock()
+
+# Sentinel stored in a class's instance slot until the singleton is built.
+_MISSING: Final = object()
+
+ForkPolicy = Literal["keep", "drop", "rebuild"]
+_FORK_POLICIES: Final = ("keep", "drop", "rebuild")
+
+LeaflessPolicy = Union[bool, Literal["auto"]]
+# With ``leafless="auto"``, the registered instance is leafless if its arrays
+# total at most this many bytes: small tables are embedded as constants.
+_AUTO_LEAFLESS_BYTES: Final = 64 * 1024
+
+
+class SingletonDeadlockError(RuntimeError):
+    """Raised when building a singleton would wait on itself.
+
+    This happens when a singleton's ``__init__`` (directly or through other
+    singletons) instantiates a class whose construction is already in progress
+    on a thread that is, in turn, waiting on the current thread.
+
+    """
+
+
+# Instrumented builds in progress, which share `tracemalloc`: it is started by
+# the first of them unless already tracing, and stopped by the last.
+_tracing_lock = threading.Lock()
+_tracing_builds = 0
+_started_tracing = False
+
+
+class _Counters:
+    """Instrumentation counters of one class, see `oncequinox.registry_stats`."""
+
+    __slots__ = (
+        "construction_time",
+        "discarded_args",
+        "hits",
+        "lock",
+        "misses",
+        "peak_allocation",
+    )
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discarded_args = 0
+        self.construction_time = 0.0
+        self.peak_allocation = 0
+
+    def hit(self, args: tuple[Any, ...], kwargs: dict[str, Any], /) -> None:
+        with self.lock:
+            self.hits += 1
+            if args or kwargs:
+                self.discarded_args += 1
+
+    def measure(
+        self,
+        cls: SingletonModuleMeta,
+        state: _SingletonState,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        /,
+    ) -> object:
+        """Build ``cls``, recording the time taken and the peak allocation."""
+        global _tracing_builds, _started_tracing  # noqa: PLW0603
+        with _tracing_lock:
+            if _tracing_builds == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            _tracing_builds += 1
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            return _build(cls, state, args, kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with _tracing_lock:
+                peak = max(tracemalloc.get_traced_memory()[1] - base, 0)
+                _tracing_builds -= 1
+                if _tracing_builds == 0 and _started_tracing:
+                    tracemalloc.stop()
+                    _started_tracing = False
+            with self.lock:
+                self.misses += 1
+                self.construction_time += elapsed
+                self.peak_allocation = max(self.peak_allocation, peak)
+
+
+class _SingletonState:
+    """Per-class construction state.
+
+    Each singleton class owns one of these, so threads building different
+    classes never contend with each other. The hit path never touches it.
+
+    """
+
+    __slots__ = (
+        "build_args",
+        "counters",
+        "depends_on",
+        "differentiable",
+        "embedded",
+        "flat",
+        "flat_with_keys",
+        "held",
+        "leafless",
+        "lock",
+        "mmap",
+        "on_fork",
+        "owner",
+        "pending",
+        "ref",
+        "replay",
+        "shared_memory",
+        "snapshot",
+        "token",
+        "warmup",
+        "weak",
+    )
+
+    def __init__(
+        self,
+        *,
+        weak: bool,
+        leafless: LeaflessPolicy,
+        warmup: bool,
+        depends_on: tuple[SingletonModuleMeta, ...],
+        on_fork: ForkPolicy,
+        snapshot: str | os.PathLike[str] | None,
+        mmap: bool,
+        shared_memory: bool,
+        instrument: bool,
+        differentiable: bool,
+    ) -> None:
+        self.lock = threading.Lock()
+        # Identifier of the thread currently running the class's ``__init__``.
+        self.owner: int | None = None
+        # Weak policy: the instance is only reachable through ``ref``, and the
+        # ``__singleton_instance__`` slot stays empty so every call comes here.
+        self.weak = weak
+        self.ref: weakref.ref[Any] | None = None
+        # Leafless policy: the instance flattens to no leaves, see `_wrap_pytree`.
+        # ``token`` is the aux data of the registered instance, new on each publish.
+        self.leafless = leafless
+        self.token: _Token | None = None
+        # For ``leafless="auto"``: whether the registered instance is small enough
+        # to be leafless, decided on first flatten.
+        self.embedded: bool | None = None
+        # Whether `oncequinox.warmup` builds this class.
+        self.warmup = warmup
+        # Declared dependencies, see `oncequinox.dependencies`.
+        self.depends_on = depends_on
+        # Flatten results of the registered instance, computed on first use.
+        self.flat: tuple[Any, Any] | None = None
+        self.flat_with_keys: tuple[Any, Any] | None = None
+        # In-flight build started by `SingletonModuleMeta.aget`, shared by every
+        # coroutine awaiting the class on the same event loop.
+        self.pending: asyncio.Future[Any] | None = None
+        # What a forked child does with the instance, see `_after_fork_in_child`.
+        # "rebuild" records the arguments of the build, and ``replay`` tells the
+        # child's next build to reuse them.
+        self.on_fork = on_fork
+        self.build_args: tuple[tuple[Any, ...], dict[str, Any]] | None = None
+        self.replay = False
+        # File the instance is loaded from, and whether its NumPy arrays are
+        # memory-mapped from it, see `build_from_file`.
+        self.snapshot = snapshot
+        self.mmap = mmap
+        # Whether pickles carry the instance through shared memory, see `share`.
+        self.shared_memory = shared_memory
+        # Instrumentation: the instance is held here instead of in the slot, so
+        # that every call of the class comes through `_construct` to be counted.
+        self.counters = _Counters() if instrument else None
+        self.held: object = _MISSING
+        # Whether autodiff sees the arrays of instances, see `_constant_pytree`.
+        self.differentiable = differentiable
+
+    @property
+    def instrument(self) -> bool:
+        return self.counters is not None
+
+    def clear_flat(self, *_: object) -> None:
+        """Drop the cached flatten results, e.g. when the instance is freed."""
+        self.flat = self.flat_with_keys = self.embedded = None
+
+
+class _Token:
+    """Aux data of a leafless instance, see `_leafless_pytree`.
+
+    Each published instance gets its own token, compared by identity. The
+    treedefs of a replaced instance (freed when weak, dropped after a fork, or
+    forgotten) then differ from those of the new one, so `jax.jit` retraces
+    instead of reusing code with the old arrays embedded as constants.
+
+    """
+
+    __slots__ = ("cls",)
+
+    def __init__(self, cls: SingletonModuleMeta, /) -> None:
+        self.cls = cls
+
+    def __repr__(self) -> str:
+        return f"<instance of {self.cls.__qualname__}>"
+
+
+def _lookup(cls: SingletonModuleMeta, state: _SingletonState, /) -> object:
+    """Return the built instance of ``cls``, or `_MISSING`."""
+    if state.weak:
+        ref = state.ref
+        self = None if ref is None else ref()
+        return _MISSING if self is None else self
+    if state.counters is not None:
+        return state.held
+    return cls.__singleton_instance__
+
+
+# Wait-for graph used for deadlock detection: thread id -> the state it is
+# blocked on. Together with `_SingletonState.owner` this forms a chain of
+# (thread -> class -> owning thread -> class ...). Guarded by `_graph_lock`.
+_blocked_on: dict[int, _SingletonState] = {}
+_graph_lock = threading.Lock()
+# Called with ``(cls, obj)`` whenever a singleton is flattened, while retraces are
+# watched, see `oncequinox.watch_retraces`.
+_observer: Callable[[SingletonModuleMeta, object], None] | None = None
+
+
+def _would_deadlock(state: _SingletonState, tid: int, /) -> bool:
+    """Check if thread ``tid`` blocking on ``state`` would close a cycle.
+
+    Must be called with `_graph_lock` held.
+
+    """
+    seen: set[int] = set()
+    while True:
+        owner = state.owner
+        if owner is None:
+            return False
+        if owner == tid:
+            return True
+        if owner in seen:  # a cycle not involving this thread
+            return False
+        seen.add(owner)
+        next_state = _blocked_on.get(owner)
+        if next_state is None:
+            return False
+        state = next_state
+
+
+def _construct(
+    cls: SingletonModuleMeta,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    /,
+) -> object:
+    """Build the singleton instance of ``cls`` exactly once.
+
+    Threads racing to build the same class serialise on that class's lock; the
+    losers wake up to find the instance already published and return it.
+
+    """
+    state: _SingletonState = cls.__singleton_state__
+    counters = state.counters
+    # Weakly-held and instrumented instances are only reachable from here, never
+    # from the slot.
+    if (state.weak or counters is not None) and (
+        self := _lookup(cls, state)
+    ) is not _MISSING:
+        if counters is not None:
+            counters.hit(args, kwargs)
+        return self
+
+    tid = threading.get_ident()
+
+    with _graph_lock:
+        if _would_deadlock(state, tid):
+            msg = (
+                f"deadlock detected while constructing {cls.__qualname__!r}: "
+                "its construction is already in progress and waits on this thread"
+            )
+            raise SingletonDeadlockError(msg)
+        _blocked_on[tid] = state
+
+    try:
+        state.lock.acquire()
+    finally:
+        with _graph_lock:
+            del _blocked_on[tid]
+
+    try:
+        # Another thread may have finished the build while we were waiting.
+        self = _lookup(cls, state)
+        if self is not _MISSING:
+            if counters is not None:
+                counters.hit(args, kwargs)
+            return self
+
+        if state.replay and state.build_args is not None:
+            args, kwargs = state.build_args  # rebuilding in a forked child
+
+        with _graph_lock:
+            state.owner = tid
+        try:
+            if counters is None:
+                self = _build(cls, state, args, kwargs)
+            else:
+                self = counters.measure(cls, state, args, kwargs)
+        finally:
+            with _graph_lock:
+                state.owner = None
+
+        if state.on_fork == "rebuild":
+            state.build_args = (args, kwargs)
+        state.replay = False
+        _publish(cls, state, self)
+        return self
+    finally:
+        state.lock.release()
+
+
+def _build(
+    cls: SingletonModuleMeta,
+    state: _SingletonState,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    /,
+) -> object:
+    """Create a new instance of ``cls``, as its storage policy says."""
+    if state.snapshot is not None:
+        from ._snapshot import build_from_file  # noqa: PLC0415  # imports this module
+
+        return build_from_file(cls, state.snapshot, args, kwargs, mmap=state.mmap)
+    return ModuleMeta.__call__(cls, *args, **kwargs)
+
+
+def _publish(cls: SingletonModuleMeta, state: _SingletonState, self: object, /) -> None:
+    """Make ``self`` the instance of ``cls``. Call with ``state.lock`` held."""
+    state.token = _Token(cls)
+    if state.weak:
+        # The cached flatten results hold the leaves, so drop them with it.
+        state.ref = weakref.ref(self, state.clear_flat)
+        return
+
+    if state.counters is not None:
+        state.held = self
+        return
+    # Publish last: from here on the hit path returns without locking.
+    cls.__singleton_instance__ = self
+
+
+def _unpublish(cls: SingletonModuleMeta, state: _SingletonState, /) -> None:
+    """Forget the instance of ``cls``, so that the next call builds a new one."""
+    cls.__singleton_instance__ = _MISSING
+    state.held = _MISSING
+    state.ref = None
+    state.clear_flat()
+
+
+def _install(cls: SingletonModuleMeta, self: object, /) -> object:
+    """Register an instance built elsewhere (e.g. in another process).
+
+    The instance is only installed if the class has none yet; the instance that
+    ends up registered is returned.
+
+    """
+    state: _SingletonState = cls.__singleton_state__
+    with state.lock:
+        existing = _lookup(cls, state)
+        if existing is not _MISSING:
+            return existing
+        _publish(cls, state, self)
+        return self
+
+
+def _assemble(cls: SingletonModuleMeta, fields: dict[str, Any], /) -> object:
+    """Create an instance of ``cls`` with the given field values.
+
+    The instance is assembled without running ``__init__``, as equinox does when
+    unflattening a module. It is not registered.
+
+    """
+    self: object = object.__new__(cls)
+    for name, value in fields.items():
+        object.__setattr__(self, name, value)
+    return self
+
+
+def _install_fields(cls: SingletonModuleMeta, fields: dict[str, Any], /) -> object:
+    """Install an instance of ``cls`` with the given field values, see `_assemble`."""
+    return _install(cls, _assemble(cls, fields))
+
+
+def _singleton_classes() -> list[SingletonModuleMeta]:
+    """Snapshot of every live class created by `SingletonModuleMeta`."""
+    with _registry_lock:
+        return list(_classes)
+
+
+def _policy(value: Any, parent: _SingletonState | None, name: str, default: Any) -> Any:  # noqa: ANN401
+    """Resolve a class-keyword policy: explicit, else inherited, else default."""
+    if value is not None:
+        return value
+    return default if parent is None else getattr(parent, name)
+
+
+def _clear_pending(state: _SingletonState, future: asyncio.Future[Any], /) -> None:
+    if state.pending is future:
+        state.pending = None
+
+
+def _cached_pytree(
+    state: _SingletonState,
+    cls: SingletonModuleMeta,
+    funcs: PytreeFuncs,
+    /,
+) -> PytreeFuncs:
+    """Cache the flatten results of the registered instance.
+
+    The registered instance is frozen, so its flatten results never change:
+    compute them once and return the cached tuples afterwards.
+
+    """
+    eqx_flatten, eqx_flatten_with_keys, eqx_unflatten = funcs
+
+    def flatten(obj: object, /) -> tuple[Any, Any]:
+        if _observer is not None:
+            _observer(cls, obj)
+        if obj is not _lookup(cls, state):
+            return eqx_flatten(obj)
+        flat = state.flat
+        if flat is None:
+            flat = state.flat = eqx_flatten(obj)
+        return flat
+
+    def flatten_with_keys(obj: object, /) -> tuple[Any, Any]:
+        if obj is not _lookup(cls, state):
+            return eqx_flatten_with_keys(obj)
+        flat = state.flat_with_keys
+        if flat is None:
+            flat = state.flat_with_keys = eqx_flatten_with_keys(obj)
+        return flat
+
+    return flatten, flatten_with_keys, eqx_unflatten
+
+
+def _leafless_pytree(
+    state: _SingletonState,
+    cls: SingletonModuleMeta,
+    funcs: PytreeFuncs,
+    /,
+) -> PytreeFuncs:
+    """Flatten the registered instance to no leaves.
+
+    A `_Token` of the instance is the aux data, and unflattening returns the
+    registered instance. Any other instance (e.g. one built by `object.__new__`)
+    keeps equinox's flattening. Equinox's aux data is always a tuple, so the two
+    cannot be confused when unflattening.
+
+    """
+    eqx_flatten, eqx_flatten_with_keys, eqx_unflatten = funcs
+
+    def flatten(obj: object, /) -> tuple[Any, Any]:
+        if _observer is not None:
+            _observer(cls, obj)
+        if obj is _lookup(cls, state):
+            return (), state.token
+        return eqx_flatten(obj)
+
+    def flatten_with_keys(obj: object, /) -> tuple[Any, Any]:
+        if obj is _lookup(cls, state):
+            return (), state.token
+        return eqx_flatten_with_keys(obj)
+
+    def unflatten(aux: object, children: object, /) -> object:
+        if isinstance(aux, _Token):
+            return cls()
+        return eqx_unflatten(aux, children)
+
+    return flatten, flatten_with_keys, unflatten
+
+
+def _auto_pytree(
+    state: _SingletonState,
+    cls: SingletonModuleMeta,
+    funcs: PytreeFuncs,
+    /,
+) -> PytreeFuncs:
+    """Flatten the registered instance to no leaves if its arrays are small.
+
+    The decision is made on the first flatten of each registered instance, by
+    summing the bytes of its array leaves; see `_AUTO_LEAFLESS_BYTES`.
+
+    """
+    eqx_flatten = funcs[0]
+    leafless_flatten, leafless_flatten_with_keys, unflatten = _leafless_pytree(
+        state,
+        cls,
+        funcs,
+    )
+    cached_flatten, cached_flatten_with_keys, _ = _cached_pytree(state, cls, funcs)
+
+    def embedded(obj: object, /) -> bool:
+        if obj is not _lookup(cls, state):
+            return False
+        if state.embedded is None:
+            leaves = jtu.tree_leaves(eqx_flatten(obj)[0])
+            size = sum(getattr(x, "nbytes", 0) for x in leaves)
+            state.embedded = size <= _AUTO_LEAFLESS_BYTES
+        return state.embedded
+
+    def flatten(obj: object, /) -> tuple[Any, Any]:
+        if embedded(obj):
+            return leafless_flatten(obj)
+        return cached_flatten(obj)
+
+    def flatten_with_keys(obj: object, /) -> tuple[Any, Any]:
+        if embedded(obj):
+            return leafless_flatten_with_keys(obj)
+        return cached_flatten_with_keys(obj)
+
+    return flatten, flatten_with_keys, unflatten
+
+
+def _stop_gradient(x: object, /) -> object:
+    # Concrete arrays are constants already: only tracers need stopping.
+    return jax.lax.stop_gradient(x) if isinstance(x, jax.core.Tracer) else x
+
+
+def _constant_pytree(funcs: PytreeFuncs, /) -> PytreeFuncs:
+    """Keep the arrays of every instance out of autodiff.
+
+    Leafless instances have nothing to differentiate, so autodiff allocates no
+    cotangents for them. Any other instance, with leaves, is unflattened with
+    `jax.lax.stop_gradient` applied to its traced arrays, so no cotangent flows
+    into them.
+
+    """
+    flatten, flatten_with_keys, unflatten = funcs
+
+    def constant_unflatten(aux: object, children: object, /) -> object:
+        if not isinstance(aux, _Token):
+            children = jtu.tree_map(_stop_gradient, children)
+        return unflatten(aux, children)
+
+    return flatten, flatten_with_keys, constant_unflatten
+
+
+def _wrap_pytree(
+    state: _SingletonState,
+    cls: SingletonModuleMeta,
+    funcs: PytreeFuncs,
+    /,
+) -> PytreeFuncs:
+    """Choose the pytree functions registered for ``cls``.
+
+    ``funcs`` are the ``(flatten, flatten_with_keys, unflatten)`` functions
+    equinox generated for the class.
+
+    """
+    if state.leafless == "auto":
+        funcs = _auto_pytree(state, cls, funcs)
+    elif state.leafless:
+        funcs = _leafless_pytree(state, cls, funcs)
+    else:
+        funcs = _cached_pytree(state, cls, funcs)
+    if not state.differentiable:
+        return _constant_pytree(funcs)
+    return funcs
+
+
+def _identity_eq(self: object, other: object, /) -> bool:
+    """Compare singletons by identity: each class has at most one instance."""
+    return self is other
+
+
+def _unpickle(cls: SingletonModuleMeta, /) -> object:
+    """Resolve an unpickled singleton through the registry."""
+    return cls()
+
+
+def _reduce_ex(self: object, protocol: int, /) -> str | tuple[Any, ...]:
+    """Pickle a singleton as a reference to its class, or to its shared memory.
+
+    Only the registered instance is pickled by reference. Other instances of the
+    class, such as the gradients returned by `jax.grad` or copies made by
+    `eqx.tree_at`, hold their own data and are pickled field by field, as is any
+    instance of a class with its own ``__reduce__``.
+
+    """
+    cls: SingletonModuleMeta = type(self)  # type: ignore[assignment]
+    state: _SingletonState = cls.__singleton_state__
+    own_reduce = cls.__reduce__ is not object.__reduce__  # type: ignore[comparison-overlap]
+    if own_reduce or self is not _lookup(cls, state):
+        return object.__reduce_ex__(self, protocol)
+    if state.shared_memory:
+        from ._shared import attach, share  # noqa: PLC0415  # imports this module
+
+        return attach, (share(self),)
+    return _unpickle, (cls,)
+
+
+def _copy(self: object, /) -> object:
+    return self
+
+
+def _deepcopy(self: object, memo: dict[int, object], /) -> object:
+    del memo
+    return self
 
 
 class SingletonModuleMeta(ModuleMeta):  # type: ignore[misc]
     """A metaclass for singleton Equinox modules.
 
     This metaclass ensures that only one instance of a class exists. Multiple calls
-    to instantiate the class will return the same instance. The singleton instances
-    are stored using weak references, allowing them to be garbage collected when no
-    strong references remain.
+    to instantiate the class will return the same instance. Each class holds its
+    instance strongly, so a singleton lives as long as its class does.
+
+    The instance is cached in a per-class slot, ``__singleton_instance__``, which
+    the metaclass sets on every class it creates. A cache hit therefore costs a
+    single class-attribute load, with no hashing or weak-reference creation.
+    Each class owns its slot, so subclasses never see their parent's instance.
+
+    Construction is thread-safe and happens exactly once. Threads that miss
+    block on a per-class lock, so they only wait on the class being built, while
+    hits never take a lock. If a singleton's ``__init__`` ends up waiting on its
+    own construction, a `SingletonDeadlockError` is raised instead of hanging.
+
+    The hit path reads only state owned by the class itself and writes nothing,
+    so on free-threaded builds (PEP 703) hits scale across cores: threads hitting
+    different classes share no data, and threads hitting the same class only read
+    the class's attribute cache.
+
+    With the ``weak=True`` class keyword the instance is instead held through a
+    weak reference. It is freed once nothing else refers to it, and rebuilt, with
+    the arguments of that call, the next time the class is called. Hits on weak
+    classes dereference the weak reference and so are slightly slower. The policy
+    is inherited by subclasses unless they set their own.
+
+    Since a singleton is unique by construction, the metaclass replaces
+    `equinox.Module`'s field-walking ``__eq__`` and ``__hash__`` with identity
+    based ones, which cost O(1) regardless of the fields. This matters when
+    singletons are dictionary keys or static arguments to `jax.jit`. Methods
+    defined by the class itself, or by a non-singleton base, are left alone.
+
+    With the ``leafless=True`` class keyword, the registered instance flattens to
+    a pytree with no leaves, carrying only a token of the instance in the treedef,
+    and unflattens to the registered instance itself without rebuilding anything.
+    This makes passing config-like singletons through `jax.jit`,
+    `jax.tree_util` or ``eqx.filter_*`` nearly free, and preserves identity.
+    Any arrays it holds are seen by JAX as constants rather than inputs.
+
+    Whether to embed is a trade-off: constants can be folded by XLA and cost
+    nothing per call, but they are baked into every compiled function, which
+    slows compilation and grows its memory with the size of the arrays. With
+    ``leafless="auto"`` the registered instance is leafless only if its arrays
+    total at most 64 KiB, and is otherwise passed as leaves.
+
+    With the ``differentiable=False`` class keyword, the arrays of the singleton
+    never take part in autodiff: instances with leaves are unflattened with
+    `jax.lax.stop_gradient` applied to their traced arrays, and a leafless
+    instance has nothing to differentiate, so ``jax.grad`` allocates no
+    cotangents for it. Use it for constant tables held by models that are
+    differentiated. Unless ``leafless`` is given, it defaults to ``"auto"`` for
+    such classes: small tables are embedded, and large ones stay arguments of
+    compiled functions, whose gradients are zeros.
+
+    Otherwise, since the registered instance is frozen, its flatten results are
+    computed once and cached, so flattening it again (e.g. on every `jax.jit`
+    dispatch) just returns the cached leaves and aux data.
+
+    Copying a singleton returns the singleton itself, and pickling the registered
+    instance stores only a reference to its class: unpickling resolves through
+    the registry, building the instance (without arguments) if this process has
+    not done so yet. The class must therefore be importable by its qualified
+    name, as for any pickle. Other instances, such as gradients, are pickled
+    with their fields.
+
+    Forked child processes (e.g. ``multiprocessing`` workers on Linux) inherit
+    the registry in a consistent state: construction locks held by other threads
+    at fork time are reset, and builds in progress in the parent are not visible
+    in the child, which builds those classes afresh. What the child does with an
+    already built instance is set by the ``on_fork`` class keyword: ``"keep"``
+    it (the default), ``"drop"`` it so that the next call builds a new one, or
+    ``"rebuild"`` it, with the parent's arguments, the first time it is used.
+    Dropping or rebuilding avoids using JAX arrays created before the fork.
+
+    With the ``snapshot=path`` class keyword, processes on the same machine
+    coordinate to build the instance only once. The first one to build the class
+    takes a file lock, runs ``__init__`` and writes the instance to ``path`` (see
+    `oncequinox.snapshot`). Processes that need the class meanwhile wait on the
+    lock. From then on every process loads ``path`` instead of running
+    ``__init__``. Delete the file to build afresh.
+
+    The ``mmap=path`` class keyword does the same, but memory-maps the NumPy array
+    fields of the instance, read-only, from the file. All processes then share a
+    single copy of the arrays in the page cache. Unlike the other policies,
+    ``snapshot`` and ``mmap`` are not inherited by subclasses.
+
+    With the ``shared_memory=True`` class keyword, pickling the instance (e.g. to
+    send it to a process pool worker, as a task argument or in ``initargs``) copies
+    its array fields, once, to a `multiprocessing.shared_memory` segment, and
+    pickles only a handle to it. Unpickling the handle in a process where the
+    class is not built yet installs the instance there, with its NumPy array
+    fields as read-only views of the segment: no ``__init__``, and no copies. The
+    segment's name is unlinked when the publishing process exits, and the memory
+    is freed once the last process using it has detached.
+
+    With the ``instrument=True`` class keyword, hits, misses, calls whose
+    arguments were discarded, construction time and peak allocation are counted,
+    see `oncequinox.registry_stats`.
 
     Note:
         When a singleton instance already exists, any arguments passed to subsequent
@@ -78,13 +803,284 @@ class SingletonModuleMeta(ModuleMeta):  # type: ignore[misc]
         >>> v1 is v2
         True
 
+        With ``weak=True``, a freed instance is rebuilt on the next call:
+
+        >>> import gc
+        >>> class Table(eqx.Module, metaclass=oqx.SingletonModuleMeta, weak=True):
+        ...     size: int
+        >>> Table(3).size  # the instance is freed straight after this line
+        3
+        >>> _ = gc.collect()
+        >>> Table(5).size
+        5
+
+        Singletons compare and hash by identity:
+
+        >>> Config() == Config()
+        True
+        >>> {Config(): "cached"}[Config()]
+        'cached'
+
+        With ``leafless=True``, the instance flattens to no leaves:
+
+        >>> import jax
+        >>> class Options(eqx.Module, metaclass=oqx.SingletonModuleMeta, leafless=True):
+        ...     scale: float = 2.0
+        >>> leaves, treedef = jax.tree_util.tree_flatten(Options())
+        >>> leaves
+        []
+        >>> jax.tree_util.tree_unflatten(treedef, leaves) is Options()
+        True
+
+        With ``differentiable=False``, autodiff sees no arrays:
+
+        >>> class Lookup(
+        ...     eqx.Module, metaclass=oqx.SingletonModuleMeta, differentiable=False
+        ... ):
+        ...     table: jax.Array = eqx.field(default_factory=lambda: jax.numpy.ones(3))
+        >>> grads = jax.grad(lambda lookup: lookup.table.sum())(Lookup())
+        >>> jax.tree_util.tree_leaves(grads)
+        []
+
+        Copies are the singleton itself:
+
+        >>> import copy
+        >>> copy.copy(Config()) is copy.deepcopy(Config()) is Config()
+        True
+
+        With ``on_fork="rebuild"``, forked children build their own instance:
+
+        >>> class Device(
+        ...     eqx.Module, metaclass=oqx.SingletonModuleMeta, on_fork="rebuild"
+        ... ):
+        ...     pass
+
+        With ``mmap=path``, the arrays are memory-mapped from a file:
+
+        >>> import tempfile
+        >>> import numpy as np
+        >>> path = tempfile.mkdtemp() + "/grid.eqx"
+        >>> class Grid(eqx.Module, metaclass=oqx.SingletonModuleMeta, mmap=path):
+        ...     points: np.ndarray = eqx.field(default_factory=lambda: np.arange(4.0))
+        >>> Grid().points.flags.writeable
+        False
+
+        A singleton whose ``__init__`` builds itself raises instead of hanging:
+
+        >>> class Recursive(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+        ...     def __init__(self):
+        ...         Recursive()
+        >>> Recursive()
+        Traceback (most recent call last):
+        ...
+        oncequinox._singleton.SingletonDeadlockError: deadlock detected ...
+
     """
 
-    def __call__(cls, /, *args: Any, **kwargs: Any) -> Any:
-        # Check if instance already exists
-        if cls in _singleton_insts:
-            return _singleton_insts[cls]
-        # Create new instance and cache it
-        self = super().__call__(*args, **kwargs)
-        _singleton_insts[cls] = self
-        return self
+    __singleton_instance__: Any
+    __singleton_state__: _SingletonState
+
+    def __new__(  # noqa: PYI034
+        mcs: type[SingletonModuleMeta],
+        name: str,
+        bases: tuple[type, ...],
+        dict_: dict[str, Any],
+        /,
+        *,
+        weak: bool | None = None,
+        leafless: LeaflessPolicy | None = None,
+        warmup: bool | None = None,
+        depends_on: Iterable[SingletonModuleMeta] | None = None,
+        on_fork: ForkPolicy | None = None,
+        snapshot: str | os.PathLike[str] | None = None,
+        mmap: str | os.PathLike[str] | None = None,
+        shared_memory: bool | None = None,
+        instrument: bool | None = None,
+        differentiable: bool | None = None,
+        **kwargs: object,
+    ) -> SingletonModuleMeta:
+        # Policies not given explicitly are inherited from the nearest parent.
+        parent = next(
+            (s for b in bases if (s := getattr(b, "__singleton_state__", None))),
+            None,
+        )
+        # Non-differentiable tables are embedded only if small, see `_auto_pytree`.
+        default_leafless: LeaflessPolicy = "auto" if differentiable is False else False
+        state = _SingletonState(
+            weak=_policy(weak, parent, "weak", default=False),
+            leafless=_policy(leafless, parent, "leafless", default=default_leafless),
+            warmup=_policy(warmup, parent, "warmup", default=True),
+            depends_on=tuple(_policy(depends_on, parent, "depends_on", default=())),
+            on_fork=_policy(on_fork, parent, "on_fork", default="keep"),
+            # Not inherited: the file holds the instance of one class.
+            snapshot=snapshot if mmap is None else mmap,
+            mmap=mmap is not None,
+            shared_memory=_policy(
+                shared_memory,
+                parent,
+                "shared_memory",
+                default=False,
+            ),
+            instrument=_policy(instrument, parent, "instrument", default=False),
+            differentiable=_policy(
+                differentiable,
+                parent,
+                "differentiable",
+                default=True,
+            ),
+        )
+        if snapshot is not None and mmap is not None:
+            msg = "pass either snapshot or mmap, not both"
+            raise ValueError(msg)
+        if state.leafless not in (True, False, "auto"):
+            msg = f"leafless must be True, False or 'auto', not {leafless!r}"
+            raise ValueError(msg)
+        if state.on_fork not in _FORK_POLICIES:
+            msg = f"on_fork must be 'keep', 'drop' or 'rebuild', not {on_fork!r}"
+            raise ValueError(msg)
+        with wrapping_registration(functools.partial(_wrap_pytree, state)):
+            cls = super().__new__(mcs, name, bases, dict_, **kwargs)
+        # Set on every class, so the slot is never inherited from a parent.
+        cls.__singleton_instance__ = _MISSING
+        cls.__singleton_state__ = state
+        # Replace the field-walking comparisons inherited from `eqx.Module`.
+        if cls.__eq__ is eqx.Module.__eq__:
+            cls.__eq__ = _identity_eq
+        if cls.__hash__ is eqx.Module.__hash__:
+            cls.__hash__ = object.__hash__
+        # Copies and pickles of the instance refer back to it instead of its fields.
+        if cls.__reduce_ex__ is object.__reduce_ex__:
+            cls.__reduce_ex__ = _reduce_ex
+        if not hasattr(cls, "__copy__"):
+            cls.__copy__ = _copy
+        if not hasattr(cls, "__deepcopy__"):
+            cls.__deepcopy__ = _deepcopy
+        with _registry_lock:
+            _classes.add(cls)
+        return cls  # type: ignore[no-any-return]
+
+    def __call__(cls, /, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, N805
+        # Fast path: the instance already exists.
+        self = cls.__singleton_instance__
+        if self is not _MISSING:
+            return self
+        # Slow path: create the instance and cache it.
+        return _construct(cls, args, kwargs)
+
+    async def aget(cls, /, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, N805
+        """Get the singleton instance without blocking the event loop.
+
+        If the instance exists it is returned without suspending. Otherwise the
+        first construction runs in the loop's default executor, and concurrent
+        callers on the same loop await that one build instead of starting their
+        own. Cancelling one caller does not cancel the shared build.
+
+        Examples:
+            >>> import asyncio
+            >>> import equinox as eqx
+            >>> import oncequinox as oqx
+            >>> class Table(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+            ...     size: int
+            >>> async def main():
+            ...     return await asyncio.gather(Table.aget(3), Table.aget(4))
+            >>> t1, t2 = asyncio.run(main())
+            >>> t1 is t2 is Table()
+            True
+
+        """
+        state = cls.__singleton_state__
+        self = _lookup(cls, state)
+        if self is not _MISSING:
+            if state.counters is not None:
+                state.counters.hit(args, kwargs)
+            return self
+
+        loop = asyncio.get_running_loop()
+        pending = state.pending
+        if pending is None or pending.done() or pending.get_loop() is not loop:
+            # Builds from other loops are still exactly-once: the executor thread
+            # blocks on the class lock and then finds the instance.
+            pending = loop.run_in_executor(
+                None,
+                functools.partial(_construct, cls, args, kwargs),
+            )
+            state.pending = pending
+            # Don't keep the result alive (e.g. for weak classes) once delivered.
+            pending.add_done_callback(functools.partial(_clear_pending, state))
+        return await asyncio.shield(pending)
+
+    def lazy(cls, /, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, N805
+        """Get a proxy that builds the singleton instance on first use.
+
+        Nothing is built until an attribute of the proxy is read, the proxy is
+        called, or it is flattened as a pytree; the arguments are then passed to
+        the class as usual. After the build, field reads on the proxy cost the
+        same as on the instance. See `LazySingleton`.
+
+        Examples:
+            >>> import equinox as eqx
+            >>> import oncequinox as oqx
+            >>> class Table(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+            ...     size: int
+            >>> table = Table.lazy(3)
+            >>> table
+            Table.lazy()
+            >>> table.size
+            3
+            >>> table.__wrapped__ is Table()
+            True
+
+        """
+        return LazySingleton(cls, args, kwargs)
+
+
+# =============================================================================
+# Fork handling
+
+
+def _before_fork() -> None:
+    # Keep the registries consistent across the fork: no thread may be halfway
+    # through updating them. Both locks are only ever held briefly.
+    _registry_lock.acquire()
+    _graph_lock.acquire()
+
+
+def _after_fork_in_parent() -> None:
+    _graph_lock.release()
+    _registry_lock.release()
+
+
+def _after_fork_in_child() -> None:
+    """Bring the registry into a defined state in a forked child.
+
+    Only the forking thread survives a fork, so locks held by other threads would
+    never be released, and their builds never published. The locks are replaced,
+    and each class's ``on_fork`` policy is applied to its instance.
+
+    """
+    global _registry_lock, _graph_lock, _tracing_lock  # noqa: PLW0603
+    _registry_lock = threading.Lock()
+    _graph_lock = threading.Lock()
+    _tracing_lock = threading.Lock()
+    _blocked_on.clear()
+
+    tid = threading.get_ident()
+    for cls in list(_classes):
+        state: _SingletonState = cls.__singleton_state__
+        if state.owner != tid:  # the forking thread may itself be mid-build
+            state.lock = threading.Lock()
+            state.owner = None
+        state.pending = None  # belongs to an event loop of the parent
+        if state.counters is not None:
+            state.counters.lock = threading.Lock()
+        if state.on_fork != "keep" and _lookup(cls, state) is not _MISSING:
+            _unpublish(cls, state)
+            state.replay = state.on_fork == "rebuild"
+
+
+if hasattr(os, "register_at_fork"):  # not on Windows
+    os.register_at_fork(
+        before=_before_fork,
+        after_in_parent=_after_fork_in_parent,
+        after_in_child=_after_fork_in_child,
+    )
@@ -0,0 +1,396 @@
+"""Saving built singletons to a file, and restoring them in another process."""
+
+from __future__ import annotations
+
+__all__ = ("restore", "snapshot")
+
+
+import dataclasses
+import importlib
+import os
+import pickle
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Final, Literal, cast
+
+import equinox as eqx
+import jax
+import jax.tree_util as jtu
+import numpy as np
+
+from ._singleton import (
+    _MISSING,
+    ModuleMeta,
+    SingletonModuleMeta,
+    _assemble,
+    _install_fields,
+    _lookup,
+    _singleton_classes,
+)
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from typing import BinaryIO
+
+_FORMAT: Final = "oncequinox-snapshot"
+_VERSION: Final = 1
+
+# (module, qualname) of a singleton class.
+_Key = tuple[str, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Ref:
+    """Stands in for a singleton held in the fields of another singleton."""
+
+    key: _Key
+
+
+@dataclasses.dataclass(frozen=True)
+class _ArraySpec:
+    """Shape and dtype of a saved array leaf, without its data."""
+
+    host: bool  # a NumPy rather than a JAX array
+    shape: tuple[int, ...]
+    dtype: np.dtype[Any]
+
+    @classmethod
+    def of(cls, x: jax.Array | np.ndarray, /) -> _ArraySpec:
+        return cls(isinstance(x, np.ndarray), x.shape, x.dtype)
+
+    def like(self) -> object:
+        """Return the leaf that `equinox.tree_deserialise_leaves` loads into."""
+        if self.host:  # must be an `np.ndarray` of the right shape; allocates nothing
+            return np.broadcast_to(np.empty((), self.dtype), self.shape)
+        return jax.ShapeDtypeStruct(self.shape, self.dtype)  # type: ignore[no-untyped-call]
+
+
+def _key(cls: SingletonModuleMeta, /) -> _Key:
+    return cls.__module__, cls.__qualname__
+
+
+def _resolve(key: _Key, /) -> SingletonModuleMeta | None:
+    """Import the class stored under ``key``, or return `None` if it is gone."""
+    module, qualname = key
+    try:
+        obj: Any = importlib.import_module(module)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+    except (ImportError, AttributeError):
+        return None
+    return obj if isinstance(obj, SingletonModuleMeta) else None
+
+
+def _is_singleton(x: object, /) -> bool:
+    return isinstance(type(x), SingletonModuleMeta)
+
+
+def _ref(x: object, /) -> _Ref:
+    """Replace the singleton ``x``, held in a field, by a reference to its class."""
+    cls = cast("SingletonModuleMeta", type(x))
+    if _resolve(key := _key(cls)) is not cls:
+        msg = f"cannot snapshot a reference to {cls.__qualname__!r}: not importable"
+        raise ValueError(msg)
+    return _Ref(key)
+
+
+def _split(self: object, /) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Split the fields of ``self`` into array leaves and everything else.
+
+    Singletons held in the fields are replaced by references to their class.
+
+    """
+    fields = {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}  # type: ignore[arg-type]
+    fields = jtu.tree_map(
+        lambda x: _ref(x) if _is_singleton(x) else x,
+        fields,
+        is_leaf=_is_singleton,
+    )
+    return eqx.partition(fields, eqx.is_array)
+
+
+def _eligible(cls: SingletonModuleMeta, /) -> bool:
+    """Whether ``cls`` is built, strongly held and importable by name."""
+    state = cls.__singleton_state__
+    return (
+        not state.weak
+        and _lookup(cls, state) is not _MISSING
+        and _resolve(_key(cls)) is cls
+    )
+
+
+def snapshot(
+    path: str | os.PathLike[str],
+    classes: Iterable[SingletonModuleMeta] | None = None,
+    /,
+) -> list[SingletonModuleMeta]:
+    """Save built singletons to a single file, to be loaded with `restore`.
+
+    Each class is stored by its module and qualified name, and must be importable
+    under that name wherever the snapshot is restored. Array leaves (JAX and NumPy)
+    are written with `equinox.tree_serialise_leaves`; all other field values are
+    pickled. Singletons held in the fields of a saved singleton are stored by
+    reference, and resolved when restoring.
+
+    Args:
+        path: the file to write.
+        classes: the classes to save, which are built first if need be. Defaults
+            to every built singleton that is importable by name. Classes with the
+            ``weak=True`` policy are never saved, as a restored instance would be
+            freed straight away.
+
+    Returns:
+        The classes that were saved.
+
+    Raises:
+        ValueError: if an explicitly given class, or a singleton held in the
+            fields of a saved one, cannot be imported by its qualified name, or if
+            an explicitly given class is weak.
+
+    """
+    if classes is None:
+        classes = [cls for cls in _singleton_classes() if _eligible(cls)]
+    else:
+        classes = list(classes)
+        for cls in classes:
+            cls()
+            if not _eligible(cls):
+                msg = (
+                    f"cannot snapshot {cls.__qualname__!r}: it is weak, or cannot "
+                    f"be imported as {cls.__module__}.{cls.__qualname__}"
+                )
+                raise ValueError(msg)
+
+    _write(path, [(cls, _lookup(cls, cls.__singleton_state__)) for cls in classes])
+    return classes
+
+
+def _write(
+    path: str | os.PathLike[str],
+    instances: list[tuple[SingletonModuleMeta, object]],
+    /,
+) -> None:
+    """Write ``instances`` to ``path``, atomically replacing any existing file.
+
+    Readers of ``path``, in this or any other process, therefore never see a
+    partially written snapshot.
+
+    """
+    entries = []
+    arrays = []
+    for cls, self in instances:
+        dynamic, static = _split(self)
+        entries.append((_key(cls), static, jtu.tree_map(_ArraySpec.of, dynamic)))
+        arrays.append(dynamic)
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            header = {"format": _FORMAT, "version": _VERSION, "entries": entries}
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            eqx.tree_serialise_leaves(f, arrays)
+        Path(tmp).replace(path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _map_leaf(f: BinaryIO, x: object, /) -> object:
+    """Deserialise a NumPy leaf as a read-only memory map of the file ``f``.
+
+    `equinox.tree_serialise_leaves` writes NumPy leaves in the ``.npy`` format,
+    whose data starts right after the header, at an aligned offset.
+
+    """
+    if not isinstance(x, np.ndarray):
+        return eqx.default_deserialise_filter_spec(f, x)
+    start = f.tell()
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    offset = f.tell()
+    if dtype.hasobject or 0 in shape:  # nothing to map
+        f.seek(start)
+        return np.load(f)
+    order: Literal["C", "F"] = "F" if fortran_order else "C"
+    mapped = np.memmap(f.name, dtype, mode="r", offset=offset, shape=shape, order=order)
+    f.seek(offset + mapped.nbytes)
+    # A plain `np.ndarray` view, as the deserialised leaf must match its ``like``
+    # in type. The view keeps the mapping open after the file is closed.
+    return np.asarray(mapped)
+
+
+def _read(f: BinaryIO, /, *, mmap: bool = False) -> tuple[list[Any], list[Any]]:
+    """Read the entries, and their array leaves, from an open snapshot file."""
+    header = pickle.load(f)  # noqa: S301
+    if not isinstance(header, dict) or header.get("format") != _FORMAT:
+        msg = f"{f.name!r} is not an oncequinox snapshot"
+        raise ValueError(msg)
+    if header["version"] != _VERSION:
+        msg = f"unsupported snapshot version {header['version']!r} in {f.name!r}"
+        raise ValueError(msg)
+    entries = header["entries"]
+    like = jtu.tree_map(_ArraySpec.like, [specs for _, _, specs in entries])
+    spec = _map_leaf if mmap else eqx.default_deserialise_filter_spec
+    arrays = eqx.tree_deserialise_leaves(f, like, filter_spec=spec)
+    return entries, arrays
+
+
+def _combine(
+    static: object,
+    dynamic: object,
+    resolve: Callable[[_Key], object],
+    /,
+) -> Any:  # noqa: ANN401
+    """Reassemble saved field values, resolving references to other singletons."""
+    return jtu.tree_map(
+        lambda x: resolve(x.key) if isinstance(x, _Ref) else x,
+        eqx.combine(dynamic, static),
+        is_leaf=lambda x: isinstance(x, _Ref),
+    )
+
+
+def restore(
+    path: str | os.PathLike[str],
+    /,
+    *,
+    mmap: bool = False,
+) -> list[SingletonModuleMeta]:
+    """Install the singletons saved by `snapshot`, without running ``__init__``.
+
+    This is meant to be used as the initializer of a process pool, so that workers
+    started with the ``"spawn"`` method load the parent's singletons instead of
+    building them again:
+
+    .. code-block:: python
+
+        oqx.snapshot("singletons.eqx")
+        pool = ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=oqx.restore,
+            initargs=("singletons.eqx",),
+        )
+
+    Classes that are already built in this process keep their instance, and
+    classes that can no longer be imported are skipped. A singleton referenced by
+    a restored one, but not saved itself, is built as usual.
+
+    With ``mmap=True``, NumPy array fields are not read into memory but mapped
+    read-only from the snapshot file, so every process restoring the same file
+    shares one copy of the arrays in the page cache. JAX array fields are always
+    read, as JAX arrays own their buffers.
+
+    The snapshot is unpickled, so only restore snapshots from trusted sources.
+
+    Args:
+        path: the snapshot to restore.
+        mmap: whether to memory-map NumPy array fields from ``path``.
+
+    Returns:
+        The classes whose instance was restored.
+
+    Raises:
+        ValueError: if ``path`` is not a snapshot written by this version.
+
+    """
+    with open(path, "rb") as f:  # noqa: PTH123
+        entries, arrays = _read(f, mmap=mmap)
+
+    saved = {
+        key: (static, dynamic) for (key, static, _), dynamic in zip(entries, arrays)
+    }
+    restored: list[SingletonModuleMeta] = []
+
+    def install(key: _Key, /) -> object:
+        cls = _resolve(key)
+        if cls is None:
+            return None
+        if key in saved and _lookup(cls, cls.__singleton_state__) is _MISSING:
+            static, dynamic = saved.pop(key)
+            _install_fields(cls, _combine(static, dynamic, install))
+            restored.append(cls)
+        return cls()
+
+    for key, _, _ in entries:
+        install(key)
+    return restored
+
+
+def _instance(key: _Key, /) -> object:
+    cls = _resolve(key)
+    if cls is None:
+        msg = f"cannot import the singleton class {'.'.join(key)}"
+        raise ValueError(msg)
+    return cls()
+
+
+@contextmanager
+def _file_lock(path: Path, /) -> Iterator[None]:
+    """Hold an exclusive lock on ``path``, across all processes of the machine.
+
+    The lock is released when the holder exits, even if it crashes. The lock file
+    is left in place, as removing it would race with processes about to take it.
+
+    """
+    with path.open("a+b") as f:
+        if sys.platform == "win32":
+            while True:
+                try:  # retries for ~10 s before raising
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build_from_file(
+    cls: SingletonModuleMeta,
+    path: str | os.PathLike[str],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    /,
+    *,
+    mmap: bool,
+) -> object:
+    """Load ``cls`` from the snapshot at ``path``, writing it first if need be.
+
+    Used by `SingletonModuleMeta` for classes with the ``snapshot`` or ``mmap``
+    keyword, with the class lock held. The first process to get here takes a file
+    lock next to ``path``, builds the instance as usual and writes it to ``path``.
+    Processes arriving meanwhile wait on the lock, then load what it wrote. The
+    builder loads the file too, so with ``mmap=True`` it maps the same arrays as
+    everyone else.
+
+    """
+    path = Path(path)
+    if not path.exists():  # once written, no lock is needed to read it
+        with _file_lock(path.with_name(path.name + ".lock")):
+            if not path.exists():  # unless another process wrote it meanwhile
+                _write(path, [(cls, ModuleMeta.__call__(cls, *args, **kwargs))])
+
+    with path.open("rb") as f:
+        entries, arrays = _read(f, mmap=mmap)
+    if len(entries) != 1 or entries[0][0] != _key(cls):
+        msg = f"{str(path)!r} does not hold a snapshot of {cls.__qualname__!r}"
+        raise ValueError(msg)
+    (_, static, _), dynamic = entries[0], arrays[0]
+    return _assemble(cls, _combine(static, dynamic, _instance))
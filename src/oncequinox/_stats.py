@@ -0,0 +1,68 @@
+"""Instrumentation of the singleton registry."""
+
+from __future__ import annotations
+
+__all__ = ("SingletonStats", "registry_stats")
+
+
+from typing import NamedTuple
+
+from ._singleton import SingletonModuleMeta, _singleton_classes
+
+
+class SingletonStats(NamedTuple):
+    """Counters of an instrumented singleton class, see `registry_stats`."""
+
+    hits: int
+    """Calls that returned the existing instance."""
+
+    misses: int
+    """Calls that built the instance, successfully or not."""
+
+    discarded_args: int
+    """Hits that passed arguments, which were ignored."""
+
+    construction_time: float
+    """Total wall time spent building the instance, in seconds."""
+
+    peak_allocation: int
+    """Largest peak of memory allocated by a build, in bytes."""
+
+
+def registry_stats() -> dict[SingletonModuleMeta, SingletonStats]:
+    """Return the counters of every class created with ``instrument=True``.
+
+    Instrumentation is opt-in per class, with the ``instrument=True`` class
+    keyword, and inherited by subclasses. An instrumented class keeps its instance
+    out of the ``__singleton_instance__`` slot, so its calls take a separate,
+    counting path: classes that are not instrumented pay nothing on hits.
+
+    Peak allocations are measured with `tracemalloc`, which is started for the
+    duration of each build if it is not already tracing. When builds overlap in
+    time the peaks include each other's allocations.
+
+    Examples:
+        >>> import equinox as eqx
+        >>> import oncequinox as oqx
+        >>> class Table(eqx.Module, metaclass=oqx.SingletonModuleMeta, instrument=True):
+        ...     size: int
+        >>> _ = Table(3), Table(4), Table()
+        >>> stats = oqx.registry_stats()[Table]
+        >>> stats.misses, stats.hits, stats.discarded_args
+        (1, 2, 1)
+
+    """
+    stats = {}
+    for cls in _singleton_classes():
+        counters = cls.__singleton_state__.counters
+        if counters is None:
+            continue
+        with counters.lock:
+            stats[cls] = SingletonStats(
+                hits=counters.hits,
+                misses=counters.misses,
+                discarded_args=counters.discarded_args,
+                construction_time=counters.construction_time,
+                peak_allocation=counters.peak_allocation,
+            )
+    return stats
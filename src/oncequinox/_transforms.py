@@ -0,0 +1,157 @@
+"""Equinox filtered transformations that treat singletons as static."""
+
+from __future__ import annotations
+
+__all__ = ("filter_grad", "filter_jit", "filter_vmap", "is_singleton")
+
+
+import functools
+from typing import TYPE_CHECKING, Any, cast
+
+import equinox as eqx
+import jax.tree_util as jtu
+
+from . import _singleton
+from ._singleton import SingletonModuleMeta
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def is_singleton(x: object, /) -> bool:
+    """Whether ``x`` is an instance of a `SingletonModuleMeta` class.
+
+    Pass it as ``is_leaf`` to keep singletons whole when flattening, e.g. to
+    partition them into the static part along with every other non-array leaf:
+
+    >>> import equinox as eqx
+    >>> import numpy as np
+    >>> import oncequinox as oqx
+    >>> class Table(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+    ...     values: np.ndarray = eqx.field(default_factory=lambda: np.ones(3))
+    >>> dynamic, static = eqx.partition(
+    ...     (Table(), np.zeros(2)), eqx.is_array, is_leaf=oqx.is_singleton
+    ... )
+    >>> dynamic[0] is None and static[0] is Table()
+    True
+
+    """
+    return isinstance(type(x), SingletonModuleMeta)
+
+
+class _Static:
+    """A singleton as a leaf: not a pytree, and hashed by identity."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: object, /) -> None:
+        self.value = value
+
+    def __eq__(self, other: object, /) -> bool:
+        return isinstance(other, _Static) and self.value is other.value
+
+    def __hash__(self) -> int:
+        return id(self.value)
+
+
+def _box(x: object, /) -> object:
+    return _Static(x) if is_singleton(x) else x
+
+
+def _box_argument(x: object, /) -> object:
+    if is_singleton(x) and (observer := _singleton._observer) is not None:  # noqa: SLF001
+        observer(cast("SingletonModuleMeta", type(x)), x)  # see `watch_retraces`
+    return _box(x)
+
+
+def _unbox(x: object, /) -> object:
+    return x.value if isinstance(x, _Static) else x
+
+
+def _is_static(x: object, /) -> bool:
+    return isinstance(x, _Static)
+
+
+def _filtered(
+    transform: Callable[..., Any],
+    fun: Callable[..., Any],
+    /,
+    **options: Any,  # noqa: ANN401
+) -> Callable[..., Any]:
+    """Apply an equinox filtered ``transform`` with singletons made static.
+
+    Singletons in the arguments, at any depth, are replaced by `_Static` leaves
+    before the call and restored inside ``fun``, and the same is done the other
+    way round for its outputs. Equinox sees a non-array leaf, so it is static:
+    hashed by identity, and never traced, mapped or differentiated.
+
+    """
+
+    @functools.wraps(fun)
+    def unboxed(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        args, kwargs = jtu.tree_map(_unbox, (args, kwargs), is_leaf=_is_static)
+        return jtu.tree_map(_box, fun(*args, **kwargs), is_leaf=is_singleton)
+
+    transformed = transform(unboxed, **options)
+
+    @functools.wraps(fun)
+    def boxed(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        args, kwargs = jtu.tree_map(_box_argument, (args, kwargs), is_leaf=is_singleton)
+        return jtu.tree_map(_unbox, transformed(*args, **kwargs), is_leaf=_is_static)
+
+    return boxed
+
+
+def filter_jit(fun: Callable[..., Any] | None = None, /, **jitkwargs: Any) -> Any:  # noqa: ANN401
+    """`equinox.filter_jit`, with every singleton in the arguments static.
+
+    Singletons, anywhere in the arguments, are hashed by identity instead of
+    being flattened: their arrays are not inputs of the compiled function but
+    constants in it, and calling with the same instances never retraces. Without
+    this, each call site would need its own ``eqx.partition`` filter.
+
+    >>> import equinox as eqx
+    >>> import jax
+    >>> import jax.numpy as jnp
+    >>> import oncequinox as oqx
+    >>> class Weights(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+    ...     w: jax.Array = eqx.field(default_factory=lambda: jnp.arange(3.0))
+    >>> @oqx.filter_jit
+    ... def apply(weights, x):
+    ...     assert not isinstance(weights.w, jax.core.Tracer)
+    ...     return weights.w @ x
+    >>> apply(Weights(), jnp.ones(3))
+    Array(3., dtype=float32)
+
+    Keyword arguments are passed on to `equinox.filter_jit`, and like it this can
+    be used as ``@filter_jit(donate=...)``.
+
+    """
+    if fun is None:
+        return functools.partial(filter_jit, **jitkwargs)
+    return _filtered(eqx.filter_jit, fun, **jitkwargs)
+
+
+def filter_vmap(fun: Callable[..., Any] | None = None, /, **vmapkwargs: Any) -> Any:  # noqa: ANN401
+    """`equinox.filter_vmap`, with every singleton in the arguments unmapped.
+
+    Singletons are static, so they are broadcast rather than mapped over. Where
+    ``in_axes`` gives a prefix for a singleton's position, it must be `None`, or
+    a callable such as the default ``eqx.if_array(0)``.
+
+    """
+    if fun is None:
+        return functools.partial(filter_vmap, **vmapkwargs)
+    return _filtered(eqx.filter_vmap, fun, **vmapkwargs)
+
+
+def filter_grad(fun: Callable[..., Any] | None = None, /, **gradkwargs: Any) -> Any:  # noqa: ANN401
+    """`equinox.filter_grad`, with every singleton in the arguments static.
+
+    Singletons are never differentiated: where one is in the first argument, its
+    gradient is `None`, as for any other non-array leaf.
+
+    """
+    if fun is None:
+        return functools.partial(filter_grad, **gradkwargs)
+    return _filtered(eqx.filter_grad, fun, **gradkwargs)
@@ -0,0 +1,149 @@
+"""Eager, parallel construction of registered singletons."""
+
+from __future__ import annotations
+
+__all__ = ("warmup",)
+
+
+import dataclasses
+import inspect
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Literal
+
+from ._schedule import _build_in_order, _graph, _timed_build
+from ._singleton import (
+    _MISSING,
+    SingletonModuleMeta,
+    _install_fields,
+    _lookup,
+    _singleton_classes,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+def _can_warm_up(cls: SingletonModuleMeta, /) -> bool:
+    """Whether ``cls`` is unbuilt, concrete and needs no arguments."""
+    if _lookup(cls, cls.__singleton_state__) is not _MISSING:
+        return False
+    if inspect.isabstract(cls) or getattr(cls, "__abstractvars__", None):
+        return False
+    return all(
+        p.default is not p.empty or p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD)
+        for p in inspect.signature(cls).parameters.values()
+    )
+
+
+def _timed_build_fields(cls: SingletonModuleMeta, /) -> tuple[float, dict[str, Any]]:
+    """Build ``cls`` in a worker process and return its field values."""
+    start = time.perf_counter()
+    self = cls()
+    elapsed = time.perf_counter() - start
+    # Singletons pickle by reference, so ship the fields rather than the instance.
+    return elapsed, {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
+
+def _make_executor(
+    executor: Literal["thread", "process"] | Executor,
+    max_workers: int | None,
+    /,
+) -> Executor:
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers, "oncequinox-warmup")
+    if executor == "process":
+        return ProcessPoolExecutor(max_workers)
+    if isinstance(executor, Executor):
+        return executor
+    msg = f"executor must be 'thread', 'process' or an Executor, not {executor!r}"  # type: ignore[unreachable]
+    raise ValueError(msg)
+
+
+def warmup(
+    classes: Iterable[SingletonModuleMeta] | None = None,
+    /,
+    *,
+    executor: Literal["thread", "process"] | Executor = "thread",
+    max_workers: int | None = None,
+) -> dict[SingletonModuleMeta, float]:
+    """Build singletons eagerly and in parallel.
+
+    By default every class created with `SingletonModuleMeta` is considered,
+    except those that opted out with the ``warmup=False`` class keyword. Classes
+    that are already built, abstract, or need constructor arguments are skipped.
+
+    Each class is built after its dependencies (see `dependencies`), which are
+    warmed up too unless they would be skipped or opted out. Those are left to
+    the classes that need them, which build them on first use.
+
+    Args:
+        classes: the classes to build. Defaults to every registered class that
+            has not opted out.
+        executor: ``"thread"`` builds the instances on a thread pool.
+            ``"process"`` builds them in worker processes and ships their fields
+            back, which avoids the GIL for pure-Python ``__init__`` work. The
+            classes, and their fields, must then be picklable. An existing
+            `concurrent.futures.Executor` may also be passed; it is not shut down.
+        max_workers: passed to the executor created for ``"thread"`` and
+            ``"process"``.
+
+    Returns:
+        The construction time, in seconds, of each class that was built.
+
+    Raises:
+        graphlib.CycleError: if the classes depend on each other in a cycle.
+        Exception: the first exception raised by a build, once the builds in
+            flight have finished. Classes depending on the failed one are not
+            built.
+
+    Examples:
+        >>> import equinox as eqx
+        >>> import oncequinox as oqx
+        >>> class Table(eqx.Module, metaclass=oqx.SingletonModuleMeta):
+        ...     size: int = 3
+        >>> class Lazy(eqx.Module, metaclass=oqx.SingletonModuleMeta, warmup=False):
+        ...     size: int = 4
+        >>> times = oqx.warmup()
+        >>> Table in times, Lazy in times
+        (True, False)
+        >>> Table.__singleton_instance__ is Table()
+        True
+
+    """
+    if classes is None:
+        classes = [c for c in _singleton_classes() if c.__singleton_state__.warmup]
+    candidates = dict.fromkeys(cls for cls in classes if _can_warm_up(cls))
+    if not candidates:
+        return {}
+
+    def eligible(dependency: SingletonModuleMeta, /) -> bool:
+        opted_in = dependency in candidates or dependency.__singleton_state__.warmup
+        return opted_in and _can_warm_up(dependency)
+
+    # Build in dependency order, so dependents don't wait on a pool worker.
+    graph = _graph(candidates, eligible)
+    pool = _make_executor(executor, max_workers)
+    in_process = isinstance(pool, ProcessPoolExecutor)
+    build: Any = _timed_build_fields if in_process else _timed_build
+
+    times: dict[SingletonModuleMeta, float] = {}
+
+    def done(
+        cls: SingletonModuleMeta,
+        result: float | tuple[float, dict[str, Any]],
+        /,
+    ) -> None:
+        if isinstance(result, tuple):  # built in a worker process
+            elapsed, fields = result
+            _install_fields(cls, fields)
+        else:
+            elapsed = result
+        times[cls] = elapsed
+
+    try:
+        _build_in_order(graph, pool, build, done)
+    finally:
+        if pool is not executor:
+            pool.shutdown(wait=True)
+    return times
@@ -1,17 +1,134 @@
 """Unit tests."""
 
+import asyncio
+import copy
+import functools
 import gc
+import graphlib
+import multiprocessing
+import multiprocessing.shared_memory
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
 import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import equinox as eqx
+import jax
+import jax.numpy as jnp
+import numpy as np
 import pytest
 
-from oncequinox import SingletonModuleMeta
+from oncequinox import (
+    LazySingleton,
+    MultitonModuleMeta,
+    SingletonDeadlockError,
+    SingletonModuleMeta,
+    SingletonStats,
+    _shared,
+    _singleton,
+    dependencies,
+    filter_grad,
+    filter_jit,
+    filter_vmap,
+    is_singleton,
+    registry_stats,
+    restore,
+    schedule,
+    snapshot,
+    warmup,
+    watch_retraces,
+)
 
 # =============================================================================
 # Fixtures
 
 
+class ProcessBuilt(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A module-level singleton, so that worker processes can import it."""
+
+    table: np.ndarray = eqx.field(default_factory=lambda: np.arange(4.0))
+
+
+class LookupTable(eqx.Module, metaclass=SingletonModuleMeta):
+    """A module-level singleton, so that it can be pickled by reference."""
+
+    table: np.ndarray = eqx.field(default_factory=lambda: np.zeros(1_000_000))
+
+
+class Scale(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A module-level singleton with a differentiable field."""
+
+    w: jax.Array = eqx.field(default_factory=lambda: jax.numpy.arange(3.0))
+
+
+class SnapshotUnits(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A module-level singleton held by `SnapshotTable`."""
+
+    scale: float = 2.0
+
+
+class SnapshotTable(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A module-level singleton with array, static and singleton fields."""
+
+    table: jax.Array
+    host: np.ndarray
+    name: str
+    units: SnapshotUnits
+    built_in: int  # the process that ran ``__init__``
+
+    def __init__(self):  # noqa: D107
+        self.table = jax.numpy.arange(3.0)
+        self.host = np.ones(2, dtype=np.int32)
+        self.name = "table"
+        self.units = SnapshotUnits()
+        self.built_in = os.getpid()
+
+
+class SharedTable(
+    eqx.Module,
+    metaclass=SingletonModuleMeta,
+    warmup=False,
+    shared_memory=True,
+):
+    """A module-level singleton published through shared memory."""
+
+    host: np.ndarray
+    device: jax.Array
+    built_in: int
+
+    def __init__(self):  # noqa: D107
+        self.host = np.arange(1_000_000, dtype=np.float64)
+        self.device = jax.numpy.ones(3)
+        self.built_in = os.getpid()
+
+
+def attached_shared_table(table):
+    """Report on a `SharedTable` unpickled in a worker."""
+    return (
+        table is SharedTable(),
+        table.built_in,
+        table.host.flags.writeable,
+        float(table.host.sum()),
+        np.asarray(table.device).tolist(),
+    )
+
+
+def restored_snapshot_table():
+    """Report on `SnapshotTable` in a worker, before anything calls it."""
+    restored = SnapshotTable.__singleton_instance__
+    return (
+        restored is not _singleton._MISSING,  # noqa: SLF001
+        restored.built_in,
+        restored.units is SnapshotUnits(),
+        np.asarray(restored.table).tolist(),
+    )
+
+
 @pytest.fixture
 def singleton_module():
     """Create a basic singleton module class."""
@@ -186,3 +303,1619 @@ def test_singleton_with_kwargs():
     assert instance1 is instance2
     assert instance1.x == 1
     assert instance1.y == 2
+
+
+def test_instance_slot_not_inherited(base_and_derived_modules):
+    """Test that a subclass does not reuse its parent's cached instance."""
+    base_module, derived_module = base_and_derived_modules
+
+    base_instance = base_module()
+    assert base_module.__singleton_instance__ is base_instance
+
+    # The parent's slot must not leak into the subclass.
+    derived_instance = derived_module()
+    assert derived_instance is not base_instance
+    assert derived_module.__singleton_instance__ is derived_instance
+    assert derived_instance.name == "derived"
+
+
+# =============================================================================
+# Thread safety
+
+
+def test_concurrent_construction_runs_init_once():
+    """Test that racing threads build the singleton exactly once."""
+    n_threads = 8
+    calls = []
+    barrier = threading.Barrier(n_threads)
+
+    class Slow(eqx.Module, metaclass=SingletonModuleMeta):
+        value: int
+
+        def __init__(self, value: int):
+            calls.append(value)
+            time.sleep(0.05)  # widen the race window
+            self.value = value
+
+    def build(i):
+        barrier.wait()
+        return Slow(i)
+
+    with ThreadPoolExecutor(n_threads) as pool:
+        instances = list(pool.map(build, range(n_threads)))
+
+    assert len(calls) == 1
+    assert all(inst is instances[0] for inst in instances)
+
+
+def test_failed_construction_can_be_retried():
+    """Test that an exception in ``__init__`` leaves the class buildable."""
+    attempts = []
+
+    class Flaky(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            attempts.append(None)
+            if len(attempts) == 1:
+                msg = "first attempt fails"
+                raise ValueError(msg)
+
+    with pytest.raises(ValueError, match="first attempt fails"):
+        Flaky()
+
+    assert Flaky() is Flaky()
+    assert len(attempts) == 2
+
+
+def test_recursive_construction_raises():
+    """Test that a singleton building itself raises rather than hanging."""
+
+    class Recursive(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            Recursive()
+
+    with pytest.raises(SingletonDeadlockError, match="Recursive"):
+        Recursive()
+
+
+def test_cross_thread_deadlock_raises():
+    """Test that two singletons building each other on two threads raise."""
+    both_started = threading.Barrier(2)
+    calls = {"First": 0, "Second": 0}
+
+    def sync(name):
+        # Only the first build of each class waits; retried builds must not.
+        calls[name] += 1
+        if calls[name] == 1:
+            both_started.wait(timeout=10)
+
+    class First(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            sync("First")
+            Second()
+
+    class Second(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            sync("Second")
+            time.sleep(0.05)  # let the other thread block on us first
+            First()
+
+    errors = []
+
+    def run(cls):
+        try:
+            cls()
+        except SingletonDeadlockError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(c,)) for c in (First, Second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+
+    assert not any(t.is_alive() for t in threads)
+    # Both threads finish, each with a deadlock error: one from detecting the
+    # cross-thread cycle, the other from the retried build re-entering itself.
+    assert len(errors) == 2
+
+
+# =============================================================================
+# Multiton
+
+
+@pytest.fixture
+def multiton_module():
+    """Create a multiton module class with a small LRU bound."""
+
+    class Kernel(eqx.Module, metaclass=MultitonModuleMeta, maxsize=2):
+        order: int
+        scale: float = 1.0
+
+    return Kernel
+
+
+def test_multiton_one_instance_per_key(multiton_module):
+    """Test that equal arguments share an instance, however they are spelled."""
+    k1 = multiton_module(1)
+
+    assert multiton_module(1) is k1
+    assert multiton_module(order=1) is k1
+    assert multiton_module(1, 1.0) is k1
+    assert multiton_module(1, scale=2.0) is not k1
+    assert multiton_module(2) is not k1
+
+
+def test_multiton_keys_are_typed():
+    """Test that equal arguments of different types get distinct instances."""
+
+    class Key(eqx.Module, metaclass=MultitonModuleMeta):
+        value: object
+
+        def __init__(self, value, *args, **kwargs):  # noqa: ARG002
+            self.value = value
+
+    assert len({id(Key(1)), id(Key(1.0)), id(Key(True))}) == 3  # noqa: FBT003
+    assert Key(0, 1) is not Key(0, 1.0)
+    assert Key(0, x=1) is not Key(0, x=1.0)
+    assert Key(0, 1, x=1) is Key(0, 1, x=1)
+
+
+def test_multiton_lru_eviction(multiton_module):
+    """Test that the least recently used instance is evicted past ``maxsize``."""
+    k1 = multiton_module(1)
+    k2 = multiton_module(2)
+    assert multiton_module(1) is k1  # k1 is now the most recently used
+
+    multiton_module(3)  # evicts k2
+    assert len(multiton_module.__multiton_state__.cache) == 2
+    assert multiton_module(1) is k1
+    assert multiton_module(2) is not k2
+
+
+def test_multiton_maxsize_inherited(multiton_module):
+    """Test that subclasses inherit the bound unless they override it."""
+
+    class Child(multiton_module):
+        pass
+
+    class Unbounded(multiton_module, maxsize=None):
+        pass
+
+    assert Child.__multiton_state__.maxsize == 2
+    assert Unbounded.__multiton_state__.maxsize is None
+    assert Child(1) is not multiton_module(1)
+
+
+def test_multiton_unhashable_arguments():
+    """Test that unhashable arguments raise a clear error."""
+
+    class Table(eqx.Module, metaclass=MultitonModuleMeta):
+        values: list
+
+    with pytest.raises(TypeError, match="must be hashable"):
+        Table([1, 2])
+
+
+def test_multiton_invalid_maxsize():
+    """Test that a non-positive bound is rejected."""
+    with pytest.raises(ValueError, match="maxsize"):
+
+        class Bad(eqx.Module, metaclass=MultitonModuleMeta, maxsize=0):
+            pass
+
+
+# =============================================================================
+# Weak policy
+
+
+def test_weak_singleton_is_freed_and_rebuilt():
+    """Test that a weak singleton is freed when unused and rebuilt on demand."""
+    calls = []
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, weak=True):
+        value: int
+
+        def __init__(self, value: int):
+            calls.append(value)
+            self.value = value
+
+    instance = Table(1)
+    assert Table(2) is instance  # still alive: args ignored as usual
+    ref = weakref.ref(instance)
+
+    del instance
+    gc.collect()
+    assert ref() is None
+
+    assert Table(3).value == 3
+    assert calls == [1, 3]
+
+
+def test_weak_policy_inherited():
+    """Test that subclasses inherit the weak policy unless they override it."""
+
+    class Base(eqx.Module, metaclass=SingletonModuleMeta, weak=True):
+        pass
+
+    class Child(Base):
+        pass
+
+    class Strong(Base, weak=False):
+        pass
+
+    assert Child.__singleton_state__.weak
+    assert not Strong.__singleton_state__.weak
+
+
+def test_weak_singletons_release_array_leaves():
+    """Test that dynamically created weak singletons do not leak their leaves."""
+    n_classes, n_bytes = 50, 1_000_000
+
+    def make_and_use():
+        class Leafy(eqx.Module, metaclass=SingletonModuleMeta, weak=True):
+            table: np.ndarray = eqx.field(
+                default_factory=lambda: np.ones(n_bytes, dtype=np.uint8),
+            )
+
+        return int(Leafy().table[0])
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(n_classes):
+            make_and_use()
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Every table was allocated at some point...
+    assert peak >= n_bytes
+    # ...but none of them is still alive. Class objects themselves stay pinned by
+    # JAX's pytree registry, so allow some per-class overhead.
+    assert current < n_classes * n_bytes // 10
+
+
+# =============================================================================
+# Equality and hashing
+
+
+def test_identity_eq_and_hash(singleton_module):
+    """Test that singletons compare and hash by identity."""
+    instance = singleton_module()
+
+    assert instance == singleton_module()
+    assert hash(instance) == object.__hash__(instance)
+    assert singleton_module.__eq__ is not eqx.Module.__eq__
+    # A rebuilt copy with equal fields is a different object.
+    copy = object.__new__(singleton_module)
+    object.__setattr__(copy, "value", instance.value)
+    assert instance != copy
+
+
+def test_user_defined_eq_is_kept():
+    """Test that a class's own ``__eq__`` and ``__hash__`` are not replaced."""
+
+    class Custom(eqx.Module, metaclass=SingletonModuleMeta):
+        def __eq__(self, other):
+            return False
+
+        def __hash__(self):
+            return 7
+
+    assert Custom() != Custom()
+    assert hash(Custom()) == 7
+
+
+def test_singleton_as_jit_static_argument(singleton_module):
+    """Test that singletons work as static arguments to ``jax.jit``."""
+    traces = []
+
+    @functools.partial(jax.jit, static_argnums=1)
+    def f(x, cfg):
+        traces.append(None)
+        return x * cfg.value
+
+    assert f(1.0, singleton_module()) == 42.0
+    assert f(2.0, singleton_module()) == 84.0
+    assert len(traces) == 1
+
+
+# =============================================================================
+# Pytree flattening
+
+
+@pytest.fixture
+def leafless_module():
+    """Create a leafless singleton module class holding an array."""
+
+    class Options(eqx.Module, metaclass=SingletonModuleMeta, leafless=True):
+        scale: float = 2.0
+        table: np.ndarray = eqx.field(default_factory=lambda: np.arange(3.0))
+
+    return Options
+
+
+def test_leafless_flatten_round_trip(leafless_module):
+    """Test that a leafless singleton flattens to nothing and unflattens to itself."""
+    instance = leafless_module()
+    leaves, treedef = jax.tree_util.tree_flatten(instance)
+
+    assert leaves == []
+    assert jax.tree_util.tree_unflatten(treedef, leaves) is instance
+    assert jax.tree_util.tree_map(lambda x: x + 1, instance) is instance
+
+
+def test_leafless_through_jit(leafless_module):
+    """Test that leafless singletons pass through ``jit`` with identity intact."""
+    seen = []
+
+    @eqx.filter_jit
+    def f(x, opts):
+        seen.append(opts)
+        return x * opts.scale + opts.table
+
+    out = f(jax.numpy.ones(3), leafless_module())
+    np.testing.assert_allclose(out, [2.0, 3.0, 4.0])
+    assert seen == [leafless_module()]
+    assert seen[0] is leafless_module()
+
+
+def test_leafless_other_instances_flatten_normally(leafless_module):
+    """Test that instances other than the registered one keep their leaves."""
+    leafless_module()  # register the singleton
+    other = object.__new__(leafless_module)
+    object.__setattr__(other, "scale", 3.0)
+    object.__setattr__(other, "table", np.zeros(2))
+
+    leaves, treedef = jax.tree_util.tree_flatten(other)
+    assert len(leaves) == 2
+    assert jax.tree_util.tree_unflatten(treedef, leaves) is not leafless_module()
+
+
+@pytest.mark.parametrize(
+    "policy",
+    [{"leafless": True}, {"differentiable": False}],
+    ids=["leafless", "constant"],
+)
+def test_leafless_replaced_instance_retraces(policy):
+    """Test that ``jit`` does not reuse code embedding a replaced instance's arrays."""
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, weak=True, **policy):
+        x: jax.Array
+
+    f = jax.jit(lambda t: t.x * 2)
+    np.testing.assert_array_equal(f(Table(jnp.ones(3))), [2.0, 2.0, 2.0])
+    gc.collect()  # frees the weakly-held instance
+    np.testing.assert_array_equal(f(Table(jnp.zeros(3))), [0.0, 0.0, 0.0])
+
+
+def test_leafless_auto_embeds_small_instances():
+    """Test that ``leafless="auto"`` decides by the size of the instance's arrays."""
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, leafless="auto"):
+        values: np.ndarray
+
+    Table(np.zeros(16))
+    assert jax.tree_util.tree_leaves(Table()) == []
+    assert Table.__singleton_state__.embedded
+
+    # A rebuilt instance is decided afresh.
+    forget(Table)
+    Table(np.zeros(1_000_000))
+    leaves, treedef = jax.tree_util.tree_flatten(Table())
+    assert leaves == [Table().values]
+    assert not Table.__singleton_state__.embedded
+    assert jax.tree_util.tree_unflatten(treedef, leaves).values is Table().values
+
+    class Child(Table):
+        pass
+
+    assert Child.__singleton_state__.leafless == "auto"
+
+    with pytest.raises(ValueError, match="leafless must be"):
+
+        class Bad(eqx.Module, metaclass=SingletonModuleMeta, leafless="always"):
+            pass
+
+
+def test_non_differentiable_singleton_takes_no_part_in_autodiff():
+    """Test that ``differentiable=False`` keeps a singleton's arrays out of grad."""
+
+    class Lookup(eqx.Module, metaclass=SingletonModuleMeta, differentiable=False):
+        table: jax.Array = eqx.field(default_factory=lambda: jnp.arange(4.0))
+
+    class Child(Lookup):
+        pass
+
+    def loss(params):
+        weight, lookup = params
+        return (weight * lookup.table).sum()
+
+    weight_grad, lookup_grad = jax.grad(loss)((jnp.ones(()), Lookup()))
+    assert weight_grad == 6.0
+    assert lookup_grad is Lookup()
+    assert jax.tree_util.tree_leaves(lookup_grad) == []
+    assert jax.jit(jax.grad(loss))((jnp.ones(()), Lookup()))[0] == 6.0
+
+    # Other instances keep their leaves, but no cotangent flows into them.
+    copy_ = _singleton._assemble(Lookup, {"table": jnp.ones(4)})  # noqa: SLF001
+    _, copy_grad = jax.grad(loss)((jnp.ones(()), copy_))
+    np.testing.assert_array_equal(copy_grad.table, np.zeros(4))
+
+    assert not Child.__singleton_state__.differentiable
+
+
+def test_non_differentiable_singleton_respects_leafless():
+    """Test that large, or explicitly leafful, tables stay arguments with no grad."""
+
+    class Large(eqx.Module, metaclass=SingletonModuleMeta, differentiable=False):
+        table: jax.Array = eqx.field(default_factory=lambda: jnp.ones(100_000))
+
+    class Small(
+        eqx.Module,
+        metaclass=SingletonModuleMeta,
+        differentiable=False,
+        leafless=False,
+    ):
+        table: jax.Array = eqx.field(default_factory=lambda: jnp.ones(4))
+
+    def loss(weight, lookup):
+        return (weight * lookup.table).sum()
+
+    assert Large.__singleton_state__.leafless == "auto"
+    for cls in (Large, Small):
+        assert jax.tree_util.tree_leaves(cls()) == [cls().table]
+        weight_grad, lookup_grad = jax.jit(jax.grad(loss, argnums=(0, 1)))(
+            jnp.ones(()),
+            cls(),
+        )
+        assert weight_grad == cls().table.size
+        np.testing.assert_array_equal(lookup_grad.table, np.zeros_like(cls().table))
+
+
+def test_registration_hook_is_removed():
+    """Test that creating a singleton class leaves JAX's registration untouched."""
+    original = jax.tree_util.register_pytree_with_keys
+
+    class Temp(eqx.Module, metaclass=SingletonModuleMeta, leafless=True):
+        pass
+
+    class Plain(eqx.Module):
+        x: int = 1
+
+    assert jax.tree_util.register_pytree_with_keys is original
+    assert jax.tree_util.tree_leaves(Plain()) == [1]
+
+
+def test_flatten_is_cached_for_registered_instance():
+    """Test that the registered instance is flattened once and then cached."""
+
+    class Tables(eqx.Module, metaclass=SingletonModuleMeta):
+        a: np.ndarray = eqx.field(default_factory=lambda: np.zeros(2))
+        b: np.ndarray = eqx.field(default_factory=lambda: np.ones(2))
+
+    instance = Tables()
+    leaves1, treedef1 = jax.tree_util.tree_flatten(instance)
+    flat = Tables.__singleton_state__.flat
+    leaves2, treedef2 = jax.tree_util.tree_flatten(instance)
+
+    assert flat is not None
+    assert Tables.__singleton_state__.flat is flat
+    assert leaves1[0] is leaves2[0] is instance.a
+    assert treedef1 == treedef2
+
+    # Rebuilt copies are flattened normally.
+    copy = jax.tree_util.tree_unflatten(treedef1, [np.ones(2), np.ones(2)])
+    assert jax.tree_util.tree_leaves(copy)[0] is not instance.a
+
+
+def test_flatten_cache_released_with_weak_instance():
+    """Test that a freed weak instance does not keep its cached leaves alive."""
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, weak=True):
+        values: np.ndarray = eqx.field(default_factory=lambda: np.zeros(2))
+
+    jax.tree_util.tree_leaves(Table())
+    gc.collect()
+    assert Table.__singleton_state__.flat is None
+
+
+# =============================================================================
+# Copying and pickling
+
+
+def test_copy_returns_self():
+    """Test that shallow and deep copies return the singleton itself."""
+    instance = LookupTable()
+
+    assert copy.copy(instance) is instance
+    assert copy.deepcopy(instance) is instance
+    assert copy.deepcopy([instance])[0] is instance
+
+
+def test_pickle_by_reference():
+    """Test that pickling stores a class reference and resolves to the instance."""
+    instance = LookupTable()
+    data = pickle.dumps(instance)
+
+    assert len(data) < 1_000  # not the 8 MB table
+    assert pickle.loads(data) is instance  # noqa: S301
+
+
+def test_pickle_other_instances_by_value():
+    """Test that instances other than the registered one keep their own data."""
+    grads = jax.grad(lambda s: (s.w**2).sum())(Scale())
+    restored = pickle.loads(pickle.dumps(grads))  # noqa: S301
+
+    assert restored is not Scale()
+    np.testing.assert_array_equal(restored.w, 2 * Scale().w)
+
+
+def test_user_defined_reduce_is_kept():
+    """Test that a class's own ``__reduce__`` is not replaced."""
+
+    class Custom(eqx.Module, metaclass=SingletonModuleMeta):
+        def __reduce__(self):
+            return (str, ("custom",))
+
+    assert pickle.loads(pickle.dumps(Custom())) == "custom"  # noqa: S301
+
+
+# =============================================================================
+# Imports
+
+
+def test_import_does_not_load_jax():
+    """Test that importing the package defers importing equinox and JAX."""
+    code = (
+        "import sys, oncequinox; "
+        "assert 'jax' not in sys.modules and 'equinox' not in sys.modules; "
+        "oncequinox.SingletonModuleMeta; "
+        "assert 'equinox' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+
+
+def test_lazy_attributes():
+    """Test that the lazily resolved names are the real objects."""
+    import oncequinox  # noqa: PLC0415
+    from oncequinox import _singleton  # noqa: PLC0415
+
+    assert oncequinox.SingletonModuleMeta is _singleton.SingletonModuleMeta
+    assert set(oncequinox.__all__) <= set(dir(oncequinox))
+    with pytest.raises(AttributeError, match="no attribute"):
+        _ = oncequinox.DoesNotExist
+
+
+# =============================================================================
+# Asyncio
+
+
+def test_aget_hit_does_not_suspend(singleton_module):
+    """Test that ``aget`` on a built singleton completes without suspending."""
+    instance = singleton_module()
+    coro = singleton_module.aget()
+
+    with pytest.raises(StopIteration) as excinfo:
+        coro.send(None)
+    assert excinfo.value.value is instance
+
+
+def test_aget_builds_once_off_loop():
+    """Test that concurrent ``aget`` calls share one build that runs off-loop."""
+    calls = []
+
+    class Slow(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            calls.append(threading.get_ident())
+            time.sleep(0.2)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        instances = await asyncio.gather(*(Slow.aget() for _ in range(5)))
+        task.cancel()
+        return instances, ticks
+
+    instances, ticks = asyncio.run(main())
+
+    assert all(inst is Slow() for inst in instances)
+    assert len(calls) == 1
+    assert calls[0] != threading.get_ident()  # built in an executor thread
+    assert ticks > 5  # the loop kept running during the build
+    assert Slow.__singleton_state__.pending is None
+
+
+# =============================================================================
+# Warm-up
+
+
+def test_warmup_builds_in_parallel():
+    """Test that ``warmup`` builds classes concurrently and reports their times."""
+    n_classes, delay = 4, 0.2
+
+    def make():
+        class Slow(eqx.Module, metaclass=SingletonModuleMeta):
+            def __init__(self):
+                time.sleep(delay)
+
+        return Slow
+
+    classes = [make() for _ in range(n_classes)]
+    start = time.perf_counter()
+    times = warmup(classes, max_workers=n_classes)
+    elapsed = time.perf_counter() - start
+
+    assert set(times) == set(classes)
+    assert all(t >= delay for t in times.values())
+    assert elapsed < n_classes * delay
+    assert all(cls.__singleton_instance__ is cls() for cls in classes)
+
+
+def test_warmup_skips_ineligible_classes(singleton_module, singleton_module_with_args):
+    """Test that built and argument-requiring classes are skipped."""
+    built = singleton_module()
+    times = warmup([singleton_module, singleton_module_with_args])
+
+    assert times == {}
+    assert singleton_module() is built
+
+
+def test_warmup_opt_out():
+    """Test that opted-out classes, and their subclasses, are not discovered."""
+
+    class OptOut(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+        pass
+
+    class Inherits(OptOut):
+        pass
+
+    class OptIn(OptOut, warmup=True):
+        pass
+
+    assert {OptOut, Inherits, OptIn} <= set(_singleton._singleton_classes())  # noqa: SLF001
+    assert not OptOut.__singleton_state__.warmup
+    assert not Inherits.__singleton_state__.warmup
+    assert OptIn.__singleton_state__.warmup
+    # Passing a class explicitly builds it regardless.
+    assert list(warmup([OptOut])) == [OptOut]
+
+
+def test_warmup_dependencies(singleton_module_with_args):
+    """Test that dependencies are built first, unless they opted out or need args."""
+    order = []
+
+    class Heavy(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+        def __init__(self):
+            order.append("Heavy")
+
+    class Base(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            order.append("Base")
+
+    class Light(
+        eqx.Module,
+        metaclass=SingletonModuleMeta,
+        depends_on=[Heavy, Base, singleton_module_with_args],
+    ):
+        def __init__(self):
+            order.append("Light")
+
+    with ThreadPoolExecutor(2) as pool:
+        times = warmup([Light], executor=pool)
+
+    assert order == ["Base", "Light"]
+    assert set(times) == {Base, Light}
+    assert Heavy.__singleton_instance__ is _singleton._MISSING  # noqa: SLF001
+
+
+def test_warmup_in_process_pool():
+    """Test that instances built in worker processes are shipped back."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+        times = warmup([ProcessBuilt], executor=pool)
+
+    assert list(times) == [ProcessBuilt]
+    instance = ProcessBuilt.__singleton_instance__
+    assert isinstance(instance, ProcessBuilt)
+    np.testing.assert_array_equal(instance.table, np.arange(4.0))
+
+
+def test_warmup_reraises_errors():
+    """Test that a failing build is reported after the other builds finish."""
+
+    class Fails(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            msg = "broken"
+            raise RuntimeError(msg)
+
+    class Works(eqx.Module, metaclass=SingletonModuleMeta):
+        pass
+
+    with pytest.raises(RuntimeError, match="broken"):
+        warmup([Fails, Works])
+    assert Works.__singleton_instance__ is Works()
+
+
+# =============================================================================
+# Scheduling
+
+
+def test_dependencies_declared_and_inferred():
+    """Test that dependencies come from ``depends_on``, factories and annotations."""
+
+    class A(eqx.Module, metaclass=SingletonModuleMeta):
+        pass
+
+    class B(eqx.Module, metaclass=SingletonModuleMeta):
+        pass
+
+    class C(eqx.Module, metaclass=SingletonModuleMeta):
+        pass
+
+    class D(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[A]):
+        b: B = eqx.field(default_factory=B)
+
+    class E(D):
+        c: C = eqx.field(default=None)
+
+    assert dependencies(A) == ()
+    assert set(dependencies(D)) == {A, B}
+    assert set(dependencies(E)) == {A, B, C}  # inherited, plus annotated
+
+
+def test_schedule_parallel_and_critical_path():
+    """Test that independent branches overlap, and the longest chain is reported."""
+    delay = 0.2
+
+    class Root(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            time.sleep(delay)
+
+    class Left(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[Root]):
+        def __init__(self):
+            time.sleep(2 * delay)
+
+    class Right(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[Root]):
+        def __init__(self):
+            time.sleep(delay)
+
+    class Top(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[Left, Right]):
+        pass
+
+    start = time.perf_counter()
+    result = schedule([Top])
+    elapsed = time.perf_counter() - start
+
+    assert set(result.times) == {Root, Left, Right, Top}
+    assert result.critical_path == (Root, Left, Top)
+    assert result.critical_time >= 3 * delay
+    assert elapsed < 4 * delay  # Left and Right were built concurrently
+
+
+def test_schedule_dependency_order():
+    """Test that each class is built after its dependencies."""
+    order = []
+
+    class First(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            order.append("First")
+
+    class Second(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[First]):
+        def __init__(self):
+            order.append("Second")
+
+    schedule([Second])
+    assert order == ["First", "Second"]
+
+
+def test_schedule_rejects_cycles():
+    """Test that a dependency cycle is reported before anything is built."""
+    calls = []
+
+    class Ping(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            calls.append("Ping")
+
+    class Pong(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[Ping]):
+        def __init__(self):
+            calls.append("Pong")
+
+    Ping.__singleton_state__.depends_on = (Pong,)
+
+    with pytest.raises(graphlib.CycleError):
+        schedule([Ping])
+    assert calls == []
+
+
+def test_schedule_stops_dependents_on_error():
+    """Test that a failed build is raised and its dependents are not built."""
+
+    class Broken(eqx.Module, metaclass=SingletonModuleMeta):
+        def __init__(self):
+            msg = "broken"
+            raise RuntimeError(msg)
+
+    class Dependent(eqx.Module, metaclass=SingletonModuleMeta, depends_on=[Broken]):
+        pass
+
+    with pytest.raises(RuntimeError, match="broken"):
+        schedule([Dependent])
+    assert Dependent.__singleton_instance__ is _singleton._MISSING  # noqa: SLF001
+
+
+# =============================================================================
+# Lazy proxies
+
+
+def test_lazy_defers_construction():
+    """Test that ``lazy`` builds nothing until the proxy is used."""
+    calls = []
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta):
+        size: int
+
+        def __init__(self, size: int):
+            calls.append(size)
+            self.size = size
+
+        def double(self):
+            return 2 * self.size
+
+    proxy = Table.lazy(3)
+    assert isinstance(proxy, LazySingleton)
+    assert isinstance(proxy, Table)  # without building
+    assert calls == []
+    assert repr(proxy).endswith("Table.lazy()")
+
+    assert proxy.size == 3
+    assert proxy.double() == 6
+    assert calls == [3]
+    assert proxy.__wrapped__ is Table()
+    assert repr(proxy) == repr(Table())
+
+
+def test_lazy_caches_after_build():
+    """Test that fields and methods are read from the proxy itself once built."""
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta):
+        size: int = 3
+
+        def double(self):
+            return 2 * self.size
+
+        @property
+        def half(self):
+            return self.size / 2
+
+    proxy = Table.lazy()
+    _ = proxy.size
+
+    cached = vars(proxy)
+    assert cached["size"] == 3
+    assert cached["__wrapped__"] is Table()
+    _ = proxy.double, proxy.half
+    assert "double" in cached  # methods are cached as they are looked up
+    assert "half" not in cached  # properties are always forwarded
+
+
+def test_lazy_weak_does_not_cache():
+    """Test that a proxy of a weak class never keeps the instance alive."""
+
+    class Weak(eqx.Module, metaclass=SingletonModuleMeta, weak=True):
+        value: int = 1
+
+    proxy = Weak.lazy()
+    assert proxy.value == 1
+    assert vars(proxy) == {}
+
+    gc.collect()
+    assert (
+        Weak.__singleton_state__.ref is None or Weak.__singleton_state__.ref() is None
+    )
+
+
+def test_lazy_call_and_pytree():
+    """Test that calling or flattening the proxy builds the instance."""
+
+    class Scale(eqx.Module, metaclass=SingletonModuleMeta):
+        factor: jax.Array = eqx.field(default_factory=lambda: jax.numpy.asarray(2.0))
+
+        def __call__(self, x):
+            return self.factor * x
+
+    assert Scale.lazy()(3.0) == 6.0
+
+    class Offset(eqx.Module, metaclass=SingletonModuleMeta):
+        shift: jax.Array = eqx.field(default_factory=lambda: jax.numpy.asarray(1.0))
+
+    proxy = Offset.lazy()
+    leaves = jax.tree_util.tree_leaves(proxy)
+    assert len(leaves) == 1
+    assert Offset.__singleton_instance__ is not _singleton._MISSING  # noqa: SLF001
+
+    @jax.jit
+    def f(module, x):
+        return module.shift + x
+
+    assert f(proxy, 1.0) == 2.0
+    rebuilt = jax.tree_util.tree_unflatten(*reversed(jax.tree_util.tree_flatten(proxy)))
+    assert isinstance(rebuilt, Offset)
+
+
+def test_lazy_copy_and_pickle():
+    """Test that copies of a proxy are the proxy, and pickling defers the build."""
+    proxy = LookupTable.lazy()
+    assert copy.copy(proxy) is proxy
+    assert copy.deepcopy(proxy) is proxy
+
+    restored = pickle.loads(pickle.dumps(proxy))  # noqa: S301
+    assert isinstance(restored, LazySingleton)
+    assert restored.__wrapped__ is LookupTable()
+
+
+# =============================================================================
+# Forking
+
+
+def forks(test):
+    """Mark a test that forks the test process.
+
+    JAX warns that forking a multithreaded process is unsafe; these tests do it
+    on purpose, and only touch pure-Python state in the child.
+
+    """
+    marks = (
+        pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork"),
+        pytest.mark.filterwarnings("ignore::RuntimeWarning"),
+        pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning"),
+    )
+    for mark in marks:
+        test = mark(test)
+    return test
+
+
+def run_in_fork(func, timeout=10.0):
+    """Run ``func`` in a forked child and return its exit status.
+
+    The child exits with 0 if ``func`` returns a truthy value and 1 otherwise. A
+    child still running after ``timeout`` seconds is killed, and counts as hung.
+
+    """
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover - runs in the child
+        code = 1
+        try:
+            code = 0 if func() else 1
+        finally:
+            os._exit(code)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.01)
+    os.kill(pid, 9)
+    os.waitpid(pid, 0)
+    return "hung"
+
+
+@forks
+@pytest.mark.parametrize("policy", ["keep", "drop", "rebuild"])
+def test_fork_policies(policy):
+    """Test that the ``on_fork`` policy is applied to built instances in a child."""
+    calls = []
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, on_fork=policy):
+        size: int
+
+        def __init__(self, size: int):
+            calls.append(size)
+            self.size = size
+
+    parent = Table(3)
+
+    def child():
+        state = Table.__singleton_state__
+        if policy == "keep":
+            return Table(5) is parent and calls == [3]
+        if Table.__singleton_instance__ is not _singleton._MISSING:  # noqa: SLF001
+            return False
+        if policy == "drop":
+            return Table(5).size == 5 and Table() is not parent
+        return state.replay and Table().size == 3 and calls == [3, 3]
+
+    assert run_in_fork(child) == 0
+    assert Table() is parent
+
+
+def test_fork_policy_validation():
+    """Test that ``on_fork`` is inherited, and invalid policies are rejected."""
+
+    class Base(eqx.Module, metaclass=SingletonModuleMeta, on_fork="drop"):
+        pass
+
+    class Child(Base):
+        pass
+
+    assert Child.__singleton_state__.on_fork == "drop"
+    with pytest.raises(ValueError, match="on_fork"):
+
+        class Bad(eqx.Module, metaclass=SingletonModuleMeta, on_fork="copy"):
+            pass
+
+
+@forks
+def test_fork_during_build():
+    """Test that a fork while another thread is mid-build leaves no held locks."""
+    started, release = threading.Event(), threading.Event()
+    parent_pid = os.getpid()
+
+    class Slow(eqx.Module, metaclass=SingletonModuleMeta):
+        pid: int
+
+        def __init__(self):
+            if os.getpid() == parent_pid:
+                started.set()
+                release.wait()
+            self.pid = os.getpid()
+
+    builder = threading.Thread(target=Slow)
+    builder.start()
+    started.wait()
+    try:
+        # In the child the build lock is held by a thread that no longer exists.
+        status = run_in_fork(lambda: Slow().pid == os.getpid())
+    finally:
+        release.set()
+        builder.join()
+
+    assert status == 0
+    assert Slow().pid == parent_pid
+
+
+@forks
+def test_fork_while_sharing():
+    """Test that a fork while arrays are copied to shared memory frees the lock."""
+    with _shared._lock:  # noqa: SLF001  # as held by a thread publishing an instance
+        status = run_in_fork(lambda: _shared._lock.acquire(timeout=1))  # noqa: SLF001
+
+    assert status == 0
+
+
+# =============================================================================
+# Snapshots
+
+
+def forget(*classes):
+    """Drop the instances of ``classes``, as if this were a fresh process."""
+    for cls in classes:
+        _singleton._unpublish(cls, cls.__singleton_state__)  # noqa: SLF001
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that restoring installs the saved fields without running ``__init__``."""
+    path = tmp_path / "singletons.eqx"
+    original = SnapshotTable()
+    assert snapshot(path, [SnapshotTable, SnapshotUnits]) == [
+        SnapshotTable,
+        SnapshotUnits,
+    ]
+
+    forget(SnapshotTable, SnapshotUnits)
+    restored = restore(path)
+
+    assert set(restored) == {SnapshotTable, SnapshotUnits}
+    table = SnapshotTable.__singleton_instance__
+    assert table is not original
+    assert isinstance(table.table, jax.Array)
+    np.testing.assert_array_equal(table.table, original.table)
+    assert isinstance(table.host, np.ndarray)
+    assert table.host.dtype == np.int32
+    assert table.name == "table"
+    assert table.units is SnapshotUnits()
+
+
+def test_restore_keeps_built_instances(tmp_path):
+    """Test that classes already built in the restoring process are left alone."""
+    path = tmp_path / "singletons.eqx"
+    snapshot(path, [SnapshotTable])
+    before = SnapshotTable()
+
+    assert restore(path) == []
+    assert SnapshotTable() is before
+
+
+def test_snapshot_defaults_to_importable_classes(tmp_path):
+    """Test that local and weak classes are skipped, or rejected when explicit."""
+
+    class Local(eqx.Module, metaclass=SingletonModuleMeta):
+        pass
+
+    Local()
+    SnapshotTable()
+    saved = snapshot(tmp_path / "all.eqx")
+    assert SnapshotTable in saved
+    assert Local not in saved
+
+    with pytest.raises(ValueError, match="cannot snapshot"):
+        snapshot(tmp_path / "local.eqx", [Local])
+
+
+def test_restore_rejects_other_files(tmp_path):
+    """Test that files that are not snapshots are rejected."""
+    path = tmp_path / "other.pkl"
+    path.write_bytes(pickle.dumps({"format": "other"}))
+    with pytest.raises(ValueError, match="not an oncequinox snapshot"):
+        restore(path)
+
+
+def test_restore_in_spawned_workers(tmp_path):
+    """Test that spawned workers restore the parent's instances in their initializer."""
+    path = tmp_path / "singletons.eqx"
+    snapshot(path, [SnapshotTable])
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        1,
+        mp_context=ctx,
+        initializer=restore,
+        initargs=(path,),
+    ) as pool:
+        result = pool.submit(restored_snapshot_table).result()
+
+    assert result == (True, os.getpid(), True, [0.0, 1.0, 2.0])
+
+
+# =============================================================================
+# Memory-mapped storage
+
+
+def is_mapped(array):
+    """Whether ``array`` is a read-only view of a memory-mapped file."""
+    return not array.flags.writeable and isinstance(array.base, np.memmap)
+
+
+def test_restore_mmap(tmp_path):
+    """Test that ``mmap=True`` maps NumPy leaves and reads JAX ones."""
+    path = tmp_path / "singletons.eqx"
+    original = SnapshotTable()
+    snapshot(path, [SnapshotTable])
+
+    forget(SnapshotTable)
+    restore(path, mmap=True)
+
+    table = SnapshotTable()
+    assert is_mapped(table.host)
+    np.testing.assert_array_equal(table.host, original.host)
+    assert isinstance(table.table, jax.Array)
+    np.testing.assert_array_equal(table.table, original.table)
+
+
+def test_mmap_policy(tmp_path):
+    """Test that the first build writes the file, and later builds only map it."""
+    path = tmp_path / "grid.eqx"
+    calls = []
+
+    class Grid(eqx.Module, metaclass=SingletonModuleMeta, mmap=path):
+        points: np.ndarray
+        name: str
+
+        def __init__(self, n: int = 5):
+            calls.append(n)
+            self.points = np.linspace(0.0, 1.0, n)
+            self.name = "grid"
+
+    first = Grid(3)
+    assert path.exists()
+    assert calls == [3]
+    assert is_mapped(first.points)
+    assert first.points.shape == (3,)
+
+    forget(Grid)  # as in another process
+    second = Grid()
+    assert calls == [3]  # mapped, not rebuilt
+    assert second is not first
+    assert is_mapped(second.points)
+    np.testing.assert_array_equal(second.points, first.points)
+    assert second.name == "grid"
+
+    class Sub(Grid):
+        pass
+
+    assert Sub.__singleton_state__.snapshot is None
+
+
+def test_mmap_policy_rejects_other_classes(tmp_path):
+    """Test that a file holding another class's instance is not mapped."""
+    path = tmp_path / "table.eqx"
+    snapshot(path, [SnapshotTable])
+
+    class Other(eqx.Module, metaclass=SingletonModuleMeta, mmap=path):
+        pass
+
+    with pytest.raises(ValueError, match="does not hold a snapshot of"):
+        Other()
+
+
+# =============================================================================
+# Shared memory
+
+
+def test_shared_memory_pickles_a_handle():
+    """Test that pickles carry a small handle, published once, to the instance."""
+    table = SharedTable()
+    payload = pickle.dumps(table)
+
+    assert len(payload) < table.host.nbytes / 100
+    assert pickle.dumps(table) == payload  # published once
+    assert pickle.loads(payload) is table  # noqa: S301  # already built here
+    assert copy.deepcopy(table) is table
+
+
+def test_shared_memory_publishes_the_registered_instance_only():
+    """Test that a copy of a shared singleton is pickled by value, not published."""
+    table = SharedTable()
+    other = eqx.tree_at(lambda t: t.device, table, jax.numpy.zeros(3))
+    restored = pickle.loads(pickle.dumps(other))  # noqa: S301
+
+    assert restored is not table
+    np.testing.assert_array_equal(restored.device, np.zeros(3))
+
+
+def test_shared_memory_attach_in_workers():
+    """Test that workers attach to the parent's arrays without building."""
+    table = SharedTable()
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(2, mp_context=ctx) as pool:
+        results = list(pool.map(attached_shared_table, [table, table]))
+
+    expected = (True, os.getpid(), False, float(table.host.sum()), [1.0, 1.0, 1.0])
+    assert results == [expected, expected]
+
+
+def test_shared_memory_unlinked_at_exit():
+    """Test that the publishing process unlinks its segments when it exits."""
+    code = """if True:
+        import pickle
+        import equinox as eqx, numpy as np
+        from oncequinox import SingletonModuleMeta, _shared
+
+        class T(eqx.Module, metaclass=SingletonModuleMeta, shared_memory=True):
+            x: np.ndarray = eqx.field(default_factory=lambda: np.ones(10))
+
+        print(pickle.loads(pickle.dumps(T())) is T())
+        print(_shared.share(T()).name)
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    same, name = result.stdout.split()
+
+    assert same == "True"
+    with pytest.raises(FileNotFoundError):
+        multiprocessing.shared_memory.SharedMemory(name)
+
+
+def test_shared_memory_outlives_attached_processes():
+    """Test that a process attaching to a segment does not unlink it on exit."""
+    table = SharedTable()
+    code = """if True:
+        import pickle, sys
+        sys.path.insert(0, sys.argv[1])
+        print(pickle.loads(sys.stdin.buffer.read()).host[1])
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code, os.path.dirname(__file__)],  # noqa: PTH120
+        input=pickle.dumps(table),
+        capture_output=True,
+        check=True,
+    )
+
+    assert result.stdout.split() == [b"1.0"]
+    multiprocessing.shared_memory.SharedMemory(_shared.share(table).name).close()
+
+
+def test_shared_memory_already_unlinked_at_exit():
+    """Test that exiting is quiet when another process unlinked the segment."""
+    code = """if True:
+        import equinox as eqx, numpy as np
+        from multiprocessing.shared_memory import SharedMemory
+        from oncequinox import SingletonModuleMeta, _shared
+
+        class T(eqx.Module, metaclass=SingletonModuleMeta, shared_memory=True):
+            x: np.ndarray = eqx.field(default_factory=lambda: np.ones(10))
+
+        SharedMemory(_shared.share(T()).name).unlink()
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert "FileNotFoundError" not in result.stderr
+
+
+# =============================================================================
+# Cross-process coordination
+
+COORDINATED = """if True:
+    import os, sys, time
+    import equinox as eqx, numpy as np
+    from oncequinox import SingletonModuleMeta
+
+    path, log = sys.argv[1:]
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, snapshot=path):
+        values: np.ndarray
+        built_in: int
+
+        def __init__(self):
+            with open(log, "a") as f:
+                f.write(f"{os.getpid()}\\n")
+            time.sleep(0.5)  # long enough for every process to be waiting
+            self.values = np.arange(5.0)
+            self.built_in = os.getpid()
+
+    print(Table().built_in, Table().values.sum())
+"""
+
+
+def test_snapshot_policy_one_builder(tmp_path):
+    """Test that processes starting together build once and share the result."""
+    path, log = tmp_path / "table.eqx", tmp_path / "builds.log"
+    procs = [
+        subprocess.Popen(  # noqa: S603
+            [sys.executable, "-c", COORDINATED, str(path), str(log)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(4)
+    ]
+    outputs = {proc.communicate(timeout=120)[0] for proc in procs}
+
+    builders = log.read_text().split()
+    assert len(builders) == 1
+    assert outputs == {f"{builders[0]} 10.0\n"}
+    assert path.exists()
+
+
+def test_snapshot_policy_in_process(tmp_path):
+    """Test that a class with ``snapshot`` loads the file instead of building."""
+    path = tmp_path / "table.eqx"
+    calls = []
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, snapshot=path):
+        values: np.ndarray = eqx.field(default_factory=lambda: np.arange(3.0))
+
+        def __post_init__(self):
+            calls.append(1)
+
+    first = Table()
+    forget(Table)
+    second = Table()
+
+    assert calls == [1]
+    assert second is not first
+    assert second.values.flags.writeable  # read, not mapped
+    np.testing.assert_array_equal(second.values, first.values)
+
+    with pytest.raises(ValueError, match="either snapshot or mmap"):
+
+        class Both(eqx.Module, metaclass=SingletonModuleMeta, snapshot=path, mmap=path):
+            pass
+
+
+# =============================================================================
+# Instrumentation
+
+
+def test_instrument_counts_hits_and_misses():
+    """Test that an instrumented class counts hits, misses and discarded arguments."""
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta, instrument=True):
+        values: np.ndarray = eqx.field(default_factory=lambda: np.ones(100_000))
+
+    assert Table.__singleton_state__.instrument
+    first = Table()
+    assert Table() is first
+    assert Table(values=np.zeros(3)) is first
+    forget(Table)
+    Table()
+
+    stats = registry_stats()[Table]
+    assert isinstance(stats, SingletonStats)
+    assert (stats.hits, stats.misses, stats.discarded_args) == (2, 2, 1)
+    assert stats.construction_time > 0
+    assert stats.peak_allocation >= 800_000
+    assert not tracemalloc.is_tracing()  # stopped again after the build
+
+
+def test_instrument_is_opt_in_and_inherited():
+    """Test that only instrumented classes and their subclasses are counted."""
+
+    class Plain(eqx.Module, metaclass=SingletonModuleMeta):
+        pass
+
+    class Counted(eqx.Module, metaclass=SingletonModuleMeta, instrument=True):
+        pass
+
+    class Child(Counted):
+        pass
+
+    class Opted(Counted, instrument=False):
+        pass
+
+    plain = Plain()
+    assert Plain.__singleton_instance__ is plain  # the fast path is untouched
+    assert Counted.__singleton_instance__ is _singleton._MISSING  # noqa: SLF001
+    Counted()
+
+    stats = registry_stats()
+    assert Plain not in stats
+    assert Opted not in stats
+    assert Child in stats
+    assert stats[Counted].misses == 1
+
+
+def test_instrument_counts_async_hits():
+    """Test that ``aget`` counts hits of an instrumented class."""
+
+    class Service(eqx.Module, metaclass=SingletonModuleMeta, instrument=True):
+        pass
+
+    async def main():
+        return await Service.aget(), await Service.aget()
+
+    first, second = asyncio.run(main())
+    assert first is second
+    stats = registry_stats()[Service]
+    assert (stats.hits, stats.misses) == (1, 1)
+
+
+# =============================================================================
+# Retrace diagnostics
+
+
+def test_watch_retraces_records_traces_with_singletons():
+    """Test that each trace with a singleton argument is recorded, with its caller."""
+
+    class Table(eqx.Module, metaclass=SingletonModuleMeta):
+        values: jax.Array = eqx.field(default_factory=lambda: jnp.ones(3))
+
+    @jax.jit
+    def total(table, x):
+        return table.values.sum() + x
+
+    with watch_retraces() as retraces:
+        total(Table(), 1.0)
+        total(Table(), 2.0)  # cached
+        copy_ = eqx.tree_at(lambda t: t.values, Table(), jnp.ones(4))
+        total(copy_, 1.0)  # new shape, and a new instance
+
+    assert [(r.cls, r.identity_changed, r.treedef_changed) for r in retraces] == [
+        (Table, False, False),
+        (Table, True, False),
+    ]
+    assert all(r.function == "total" for r in retraces)
+    assert all(
+        r.location.startswith(__file__)
+        and r.location.endswith("in test_watch_retraces_records_traces_with_singletons")
+        for r in retraces
+    )
+    assert "a new instance, with the same treedef" in str(retraces[1])
+
+
+def test_watch_retraces_ignores_unrelated_traces():
+    """Test that flattens outside a traced call are not attributed to a trace."""
+
+    class Options(eqx.Module, metaclass=SingletonModuleMeta, leafless=True):
+        scale: float = 2.0
+
+    @jax.jit
+    def double(x):
+        return 2 * x
+
+    with watch_retraces() as retraces:
+        jax.tree_util.tree_map(lambda x: x, Options())
+        double(1.0)  # traced, without a singleton
+        eqx.filter_jit(lambda o, x: o.scale * x)(Options(), 1.0)
+
+    assert [(r.cls, r.identity_changed) for r in retraces] == [(Options, False)]
+    assert _singleton._observer is None  # noqa: SLF001
+
+    eqx.filter_jit(lambda o, x: o.scale * x)(Options(), 2.0)
+    assert len(retraces) == 1  # no longer watching
+
+
+# =============================================================================
+# Filtered transformations
+
+
+class Weights(eqx.Module, metaclass=SingletonModuleMeta, warmup=False):
+    """A config-like singleton holding arrays."""
+
+    w: jax.Array = eqx.field(default_factory=lambda: jnp.arange(3.0))
+
+
+class Model(eqx.Module):
+    """A plain module with a singleton field."""
+
+    weights: Weights
+    bias: jax.Array
+
+
+def test_filter_jit_makes_singletons_static():
+    """Test that singletons, at any depth, are static and keep their identity."""
+    traces = []
+
+    @filter_jit
+    def apply(model, x):
+        traces.append(model.weights)
+        assert not isinstance(model.weights.w, jax.core.Tracer)
+        assert isinstance(model.bias, jax.core.Tracer)
+        return model.weights.w @ x + model.bias
+
+    model = Model(Weights(), jnp.ones(()))
+    assert apply(model, jnp.ones(3)) == 4.0
+    assert apply(Model(Weights(), jnp.zeros(())), jnp.ones(3)) == 3.0
+    assert traces == [Weights()]
+    assert traces[0] is Weights()
+    assert apply.__name__ == "apply"
+
+    @filter_jit(donate="none")
+    def first(weights):
+        return weights.w[0]
+
+    assert first(Weights()) == 0.0
+    assert is_singleton(Weights())
+    assert not is_singleton(model)
+
+
+def test_filter_jit_singletons_are_seen_by_watch_retraces():
+    """Test that static singletons are reported by ``watch_retraces``."""
+
+    @filter_jit
+    def total(weights):
+        return weights.w.sum()
+
+    with watch_retraces() as retraces:
+        total(Weights())
+        total(Weights())
+    assert [(r.cls, r.identity_changed) for r in retraces] == [(Weights, False)]
+
+
+def test_filter_vmap_and_grad_leave_singletons_alone():
+    """Test that singletons are broadcast by ``filter_vmap`` and not differentiated."""
+    out = filter_vmap(lambda weights, x: weights.w * x)(Weights(), jnp.arange(2.0))
+    np.testing.assert_array_equal(out, [[0.0, 0.0, 0.0], [0.0, 1.0, 2.0]])
+
+    @filter_grad
+    def loss(model):
+        return (model.weights.w * model.bias).sum()
+
+    grads = loss(Model(Weights(), jnp.ones(())))
+    assert grads.weights is None
+    assert grads.bias == 3.0
+
+    @filter_grad(has_aux=True)
+    def loss_with_aux(x, weights):
+        return (weights.w * x).sum(), weights
+
+    grad, aux = loss_with_aux(jnp.ones(3), Weights())
+    np.testing.assert_array_equal(grad, Weights().w)
+    assert aux is Weights()